@@ -1,18 +1,84 @@
-from escpos.printer import Usb
-
 from typing import Optional
 import configparser
 
+from reciept_util import is_true
+
 CHAR_WIDTH = 42
 
+DEFAULT_WRITE_SIZE = 4096
+
+DEFAULT_USB_VENDOR_ID = 0x04b8
+DEFAULT_USB_PRODUCT_ID = 0x0202
+DEFAULT_NETWORK_PORT = 9100
+DEFAULT_NETWORK_TIMEOUT = 60
+
+
+def open_backend(printer_config):
+    """The python-escpos device named by `backend` in the [Printer] section:
+    usb (default), network (raw TCP, one socket kept open for the whole
+    run), file (raw ESC/POS bytes written to `path`) or memory (an escpos
+    Dummy whose .output holds the bytes)."""
+    # escpos (and pyusb under it) is slow to import, and --dry never needs it.
+    from escpos.printer import Dummy, File, Network, Usb
+
+    backend = printer_config.get('backend', 'usb')
+    if backend == 'usb':
+        return Usb(
+            int(printer_config.get('usb_vendor_id', str(DEFAULT_USB_VENDOR_ID)), 0),
+            int(printer_config.get('usb_product_id', str(DEFAULT_USB_PRODUCT_ID)), 0),
+        )
+    if backend == 'network':
+        return Network(
+            printer_config['host'],
+            port=int(printer_config.get('port', DEFAULT_NETWORK_PORT)),
+            timeout=float(printer_config.get('timeout', DEFAULT_NETWORK_TIMEOUT)),
+        )
+    if backend == 'file':
+        return File(printer_config['path'])
+    if backend == 'memory':
+        return Dummy()
+    raise ValueError(f"Unknown printer backend: {backend}")
+
+
 class RecieptPrinter:
-    def __init__(self, dry):
+    def __init__(self, dry, buffered=False, write_size=DEFAULT_WRITE_SIZE, backend=None, spool=None):
+        """`backend` is the escpos device to print to, from open_backend();
+        defaults to the USB printer. `buffered` encodes each receipt into
+        memory and only sends it to the device on cut()/flush(), in
+        `write_size`-byte writes, instead of one write per text()/set() call.
+        With a `spool` (a spool.PrintSpool, which owns the device) each
+        flushed receipt becomes a spooled job instead; that implies buffered."""
         self.dry = dry
+        self.spool = spool
+        self.buffered = buffered or spool is not None
+        self.write_size = write_size
+        self.device = None
+        self._captured = None
         if not self.dry:
-            self.p = Usb(0x04b8, 0x0202)
+            from escpos.printer import Dummy, Usb
+
+            if spool is None:
+                self.device = backend if backend is not None else Usb(DEFAULT_USB_VENDOR_ID, DEFAULT_USB_PRODUCT_ID)
+            self.p = Dummy() if self.buffered else self.device
         else:
             self.p = None
 
+    @classmethod
+    def from_config(cls, config, dry):
+        printer_config = config['Printer'] if 'Printer' in config else {}
+        write_size = int(printer_config.get('write_size', DEFAULT_WRITE_SIZE))
+        if not dry and is_true(printer_config.get('spool', 'true')):
+            from spool import PrintSpool
+
+            spool = PrintSpool.from_config(printer_config, lambda: open_backend(printer_config), write_size)
+            return cls(dry, write_size=write_size, spool=spool)
+        return cls(
+            dry,
+            buffered=is_true(printer_config.get('buffered', 'false')),
+            write_size=write_size,
+            backend=None if dry else open_backend(printer_config),
+        )
+
     def set_with_default(
         self,
         align: Optional[str] = "left",
@@ -67,4 +133,67 @@ class RecieptPrinter:
     def cut(self):
         if not self.dry:
             self.p.cut()
+            self.flush()
         print("Cutting...")
+
+    def flush(self):
+        """Send everything buffered so far to the device. No-op unless
+        buffered; cut() already calls this at the end of every receipt."""
+        if self.dry or not self.buffered:
+            return
+        data = self.p.output
+        self.p.clear()
+        if self._captured is not None:
+            self._captured.append(data)
+        if self.spool is not None:
+            if data:
+                self.spool.submit(data)
+            return
+        for start in range(0, len(data), self.write_size):
+            self.device._raw(data[start:start + self.write_size])
+
+    @property
+    def can_capture(self):
+        """Whether start_capture()/stop_capture() see the encoded bytes; only
+        a buffered printer has them in hand before they're sent."""
+        return not self.dry and self.buffered
+
+    def start_capture(self):
+        if self.can_capture:
+            self.flush()
+            self._captured = []
+
+    def stop_capture(self):
+        """Everything sent to the device since start_capture(), or b"" if
+        this printer can't capture."""
+        if self._captured is None:
+            return b""
+        self.flush()
+        data, self._captured = b"".join(self._captured), None
+        return data
+
+    def raw(self, data):
+        """Send already-encoded ESC/POS bytes, e.g. a cached receipt."""
+        if self.dry:
+            return
+        self.p._raw(data)
+        self.flush()
+
+    def drain(self):
+        """Flush, then wait for spooled jobs to reach the printer. False if
+        some are still spooled after the spool's retries."""
+        self.flush()
+        if self.spool is None:
+            return True
+        if not self.spool.drain():
+            print(f"{self.spool.pending()} print job(s) left spooled, will retry next run: {self.spool.last_error}")
+            return False
+        return True
+
+    def close(self):
+        """Flush anything still buffered and release the device."""
+        self.drain()
+        if self.spool is not None:
+            self.spool.close()
+        if self.device is not None:
+            self.device.close()
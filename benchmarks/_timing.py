@@ -0,0 +1,15 @@
+"""Timing shared by the benchmark scripts."""
+import time
+
+REPEATS = 5
+
+
+def best_of(fn, repeats=REPEATS):
+    """Call `fn` `repeats` times; returns the fastest time in seconds and
+    the last result."""
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
@@ -0,0 +1,58 @@
+"""Emoji stripping: reciept_util.filter_emojis / filter_emojis_many versus
+the emoji package's replace_emoji, on thousands of task/event-like names.
+
+Needs the `emoji` package for the comparison (pip install emoji).
+Run with: python3 benchmarks/bench_emoji.py
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import emoji
+
+from reciept_util import filter_emojis, filter_emojis_many
+from _timing import REPEATS, best_of
+
+NUM_NAMES = 5000
+
+WORDS = ["Workout", "Take out trash", "Call mom", "Dentist", "Groceries", "Café run", "Pay rent",
+         "Standup", "1:1 with Sam", "Laundry", "Read", "Fix sink", "Plan trip", "Water plants"]
+EMOJIS = [e for e in emoji.EMOJI_DATA if len(e) <= 4]
+
+
+def _names(rng):
+    names = []
+    for _ in range(NUM_NAMES):
+        name = rng.choice(WORDS)
+        # Most real names are plain ASCII; some carry one or two emojis.
+        if rng.random() < 0.3:
+            name = f"{rng.choice(EMOJIS)} {name}"
+        if rng.random() < 0.1:
+            name = f"{name} {rng.choice(EMOJIS)}"
+        names.append(name)
+    return names
+
+
+def main():
+    names = _names(random.Random(0))
+
+    started = time.perf_counter()
+    filter_emojis("warm up 🎉")
+    compile_ms = (time.perf_counter() - started) * 1000
+
+    baseline_s, expected = best_of(lambda: [emoji.replace_emoji(name, replace='') for name in names])
+    single_s, single = best_of(lambda: [filter_emojis(name) for name in names])
+    batch_s, batch = best_of(lambda: filter_emojis_many(names))
+
+    assert single == expected and batch == expected, "Outputs differ from emoji.replace_emoji"
+    print(f"{NUM_NAMES} names, best of {REPEATS} (pattern compiled once in {compile_ms:.1f} ms)")
+    print(f"  emoji.replace_emoji     {baseline_s * 1000:8.2f} ms")
+    print(f"  filter_emojis           {single_s * 1000:8.2f} ms  ({baseline_s / single_s:.1f}x)")
+    print(f"  filter_emojis_many      {batch_s * 1000:8.2f} ms  ({baseline_s / batch_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Schedule grid rendering on dense synthetic calendars.
+
+Times ModuleSchedule.render against the previous per-hour x per-event
+renderer (kept here as `reference_render`), checking both print the same
+grid, for a few hundred overlapping events.
+
+Run with: python3 benchmarks/bench_schedule.py
+"""
+import math
+import random
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from RecieptPrinter import CHAR_WIDTH
+from tasks_printer.context import DailyContext
+from tasks_printer.data_handlers.models import Event
+from tasks_printer.modules.schedule import (
+    COLUMN_SPACER, HOUR_LABEL_WIDTH, ModuleSchedule, _hour_position, _render_cell, format_hour_label,
+)
+from _timing import REPEATS, best_of
+
+EVENT_COUNTS = [50, 200, 500]
+
+
+class LinePrinter:
+    def __init__(self):
+        self.lines = []
+
+    def text(self, string, wrap=False):
+        self.lines.append(string)
+
+    def set(self, **kwargs):
+        pass
+
+
+def reference_assign_columns(events):
+    columns_last_end = []
+    assignments = {}
+    for event in sorted(events, key=lambda e: e.start_time):
+        for i, last_end in enumerate(columns_last_end):
+            if event.start_time >= last_end:
+                columns_last_end[i] = event.end_time
+                assignments[event] = i
+                break
+        else:
+            columns_last_end.append(event.end_time)
+            assignments[event] = len(columns_last_end) - 1
+    return assignments, max(len(columns_last_end), 1)
+
+
+def reference_render(events, start_hour, end_hour):
+    """The grid part of ModuleSchedule.render before the occupancy matrix."""
+    lines = []
+    columns, num_columns = reference_assign_columns(events)
+    grid_width = CHAR_WIDTH - HOUR_LABEL_WIDTH - len(COLUMN_SPACER) - len(COLUMN_SPACER) * (num_columns - 1)
+    col_width = max(1, grid_width // num_columns)
+
+    spans = {}
+    for event in events:
+        first_hour = max(event.start_time.hour, start_hour)
+        last_hour = min(max(math.ceil(_hour_position(event.end_time)) - 1, first_hour), end_hour)
+        spans[event] = (first_hour, last_hour)
+
+    for hour in range(start_hour, end_hour + 1):
+        cells = [" " * col_width] * num_columns
+        for event in events:
+            if not (_hour_position(event.start_time) < hour + 1 and _hour_position(event.end_time) > hour):
+                continue
+            first_hour, last_hour = spans[event]
+            is_top = hour == first_hour
+            cells[columns[event]] = _render_cell(col_width, event, is_top, hour == last_hour and not is_top)
+        lines.append(f"{format_hour_label(hour)}{COLUMN_SPACER}{COLUMN_SPACER.join(cells)}")
+    return lines
+
+
+def synthetic_events(count, rng):
+    day = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    events = []
+    for i in range(count):
+        start = day + timedelta(minutes=rng.randrange(6 * 60, 22 * 60, 15))
+        end = start + timedelta(minutes=rng.choice([15, 30, 45, 60, 90, 120, 180]))
+        events.append(Event(f"Meeting {i}", start, end_time=end))
+    events.sort(key=lambda e: e.start_time)
+    return events
+
+
+def main():
+    rng = random.Random(0)
+    module = ModuleSchedule({})
+    print(f"best of {REPEATS}, hours {module.start_hour}-{module.end_hour}")
+    for count in EVENT_COUNTS:
+        events = synthetic_events(count, rng)
+        context = DailyContext(events=events)
+
+        def render():
+            p = LinePrinter()
+            module.render(p, context)
+            return p.lines[1:]  # drop the "Today's Schedule" heading
+
+        new_s, new_lines = best_of(render)
+        old_s, old_lines = best_of(lambda: reference_render(events, module.start_hour, module.end_hour))
+        assert new_lines == old_lines, "Grid differs from the reference renderer"
+        print(f"  {count:4d} events: {old_s * 1000:8.2f} ms -> {new_s * 1000:7.2f} ms ({old_s / new_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
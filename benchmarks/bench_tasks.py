@@ -0,0 +1,128 @@
+"""Task model build and bucketing on projects with thousands of tasks.
+
+Times building the Task objects and answering the queries one receipt makes
+(tasks_today and tasks_due_within_days per project, tasks_late across all
+of them) with the slotted, bucketed models against the previous dict-backed
+models (kept here as `Reference*`), which read the clock per task and
+re-filter the task list on every query. Also reports the memory each set of
+tasks takes.
+
+Run with: python3 benchmarks/bench_tasks.py
+"""
+import random
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tasks_printer.data_handlers.models import DEFAULT_LATE_WITHIN_DAYS, Project, Task
+from _timing import REPEATS, best_of
+
+PROJECT_COUNT = 3
+TASK_COUNTS = [1000, 5000, 20000]
+
+
+class ReferenceTask:
+    def __init__(self, name, due_date=None):
+        self.name = name
+        self.due_date = due_date
+        self.delta_days = 0
+        self.subtasks = []
+        self.subtask_overrun = 0
+
+        if due_date:
+            now = datetime.now()
+            self.delta_days = (self.due_date.date() - now.date()).days
+
+    def due_today(self):
+        return self.delta_days == 0
+
+    def late_within(self, num):
+        return -num <= self.delta_days < 0
+
+    def later_than(self, num):
+        return self.delta_days < (num * -1)
+
+
+class ReferenceProject:
+    def __init__(self, id, name):
+        self.id = id
+        self.name = name
+        self.tasks = []
+
+    def tasks_today(self):
+        return list(filter(lambda t: t.due_today(), self.tasks))
+
+    def tasks_due_within_days(self, days):
+        return list(filter(lambda t: t.late_within(days), self.tasks))
+
+    def tasks_late(self, days):
+        return list(filter(lambda t: t.later_than(days), self.tasks))
+
+
+def synthetic_tasks(count, rng):
+    now = datetime.now()
+    return [(f"Task {i}", now + timedelta(days=rng.randint(-30, 5))) for i in range(count)]
+
+
+def build_reference(specs):
+    projects = []
+    for p in range(PROJECT_COUNT):
+        project = ReferenceProject(str(p), f"Project {p}")
+        project.tasks = [ReferenceTask(name, due) for name, due in specs]
+        projects.append(project)
+    return projects
+
+
+def build(specs):
+    today = datetime.now().date()
+    projects = []
+    for p in range(PROJECT_COUNT):
+        project = Project(str(p), f"Project {p}")
+        project.tasks = [Task(name, due, today=today) for name, due in specs]
+        project.bucket_tasks()
+        projects.append(project)
+    return projects
+
+
+def receipt_queries(projects):
+    """The lookups ModuleTickTick and tasks.jinja make for one receipt."""
+    days = DEFAULT_LATE_WITHIN_DAYS
+    listed = [(project.tasks_today(), project.tasks_due_within_days(days)) for project in projects]
+    reschedule = [task for project in projects for task in project.tasks_late(days)]
+    return [[[t.name for t in today], [t.name for t in late]] for today, late in listed], [t.name for t in reschedule]
+
+
+def _traced_size(fn):
+    tracemalloc.start()
+    result = fn()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    rng = random.Random(0)
+    print(f"best of {REPEATS}, {PROJECT_COUNT} projects")
+    for count in TASK_COUNTS:
+        specs = synthetic_tasks(count, rng)
+
+        old_build_s, old_projects = best_of(lambda: build_reference(specs))
+        new_build_s, new_projects = best_of(lambda: build(specs))
+        old_query_s, old_result = best_of(lambda: receipt_queries(old_projects))
+        new_query_s, new_result = best_of(lambda: receipt_queries(new_projects))
+        assert new_result == old_result, "Bucketed queries differ from the reference filters"
+
+        old_kb = _traced_size(lambda: build_reference(specs)) / 1024
+        new_kb = _traced_size(lambda: build(specs)) / 1024
+        print(f"  {count:5d} tasks/project:")
+        print(f"    build   {old_build_s * 1000:8.2f} ms -> {new_build_s * 1000:7.2f} ms ({old_build_s / new_build_s:.1f}x)")
+        print(f"    queries {old_query_s * 1000:8.2f} ms -> {new_query_s * 1000:7.2f} ms ({old_query_s / new_query_s:.1f}x)")
+        print(f"    memory  {old_kb:8.0f} KiB -> {new_kb:7.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""TickTick timestamp parsing over tens of thousands of task payloads.
+
+Times parse_ticktick_datetime against the previous
+`datetime.strptime(..., "%Y-%m-%dT%H:%M:%S.%f%z")` on the dueDate/startDate
+fields of synthetic task payloads, checking both give the same datetimes.
+"cold" clears the parser's cache before each run; "warm" reuses it, as a
+second fetch in the same process (the daemon) would.
+
+Run with: python3 benchmarks/bench_ticktick_dates.py
+"""
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tasks_printer.data_handlers.ticktick_api import TICKTICK_DATETIME_FORMAT, parse_ticktick_datetime
+from _timing import REPEATS, best_of
+
+TASK_COUNTS = [10000, 50000]
+
+
+def synthetic_payloads(count, rng):
+    """Tasks due over a few months, mostly all-day (midnight local, so many
+    share a timestamp) and the rest at quarter-hour times, half with a
+    startDate as well."""
+    day = datetime(2024, 1, 1, tzinfo=timezone(timedelta(hours=-8)))
+    payloads = []
+    for i in range(count):
+        due = day + timedelta(days=rng.randrange(120))
+        if rng.random() < 0.3:
+            due += timedelta(minutes=rng.randrange(0, 24 * 60, 15))
+        task = {'title': f"Task {i}", 'dueDate': due.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000+0000")}
+        if rng.random() < 0.5:
+            task['startDate'] = (due - timedelta(hours=1)).astimezone(timezone.utc).strftime(
+                "%Y-%m-%dT%H:%M:%S.000+0000")
+        payloads.append(task)
+    return payloads
+
+
+def parse_reference(payloads):
+    return [
+        [datetime.strptime(task[key], TICKTICK_DATETIME_FORMAT) for key in ('dueDate', 'startDate') if key in task]
+        for task in payloads
+    ]
+
+
+def parse(payloads):
+    return [
+        [parse_ticktick_datetime(task[key]) for key in ('dueDate', 'startDate') if key in task]
+        for task in payloads
+    ]
+
+
+def parse_cold(payloads):
+    parse_ticktick_datetime.cache_clear()
+    return parse(payloads)
+
+
+def main():
+    rng = random.Random(0)
+    print(f"best of {REPEATS}")
+    for count in TASK_COUNTS:
+        payloads = synthetic_payloads(count, rng)
+        old_s, old_result = best_of(lambda: parse_reference(payloads))
+        cold_s, cold_result = best_of(lambda: parse_cold(payloads))
+        warm_s, warm_result = best_of(lambda: parse(payloads))
+        assert cold_result == old_result and warm_result == old_result, "Parsed datetimes differ from strptime"
+        print(f"  {count:5d} tasks: strptime {old_s * 1000:7.1f} ms -> cold {cold_s * 1000:6.1f} ms "
+              f"({old_s / cold_s:.1f}x), warm {warm_s * 1000:6.1f} ms ({old_s / warm_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""Resident mode for main.py (`--daemon`).
+
+Instead of paying Python startup, imports, USB enumeration and template
+compilation on every print, one long-lived process keeps the printer handle,
+HTTP sessions and template/data caches warm. It prints the morning receipt
+at the `print_times` in the [Daemon] config section, and accepts on-demand
+commands over a local Unix socket (`main.py --trigger print`).
+
+Data is prefetched [Prefetch] `lead_minutes` before each scheduled print
+(see tasks_printer.prefetch), so the print itself is render + send only.
+"""
+import os
+import signal
+import socket
+import socketserver
+import threading
+import traceback
+from datetime import datetime, timedelta
+
+from RecieptPrinter import RecieptPrinter
+from tasks_printer.prefetch import DEFAULT_LEAD_MINUTES, context_for_print, prefetch
+from tasks_printer.printer import render_receipt
+from workout_printer.printer import print_workouts
+
+DEFAULT_SOCKET_PATH = "/tmp/reciept-printer.sock"
+DEFAULT_PRINT_TIMES = "06:30"
+
+# Upper bound on a single scheduler sleep, so clock changes (NTP sync after
+# boot, DST) are noticed within a minute.
+SCHEDULER_TICK_SECONDS = 60
+
+COMMANDS = ("print", "status")
+
+
+def parse_print_times(raw):
+    """"06:30, 18:00" -> [(6, 30), (18, 0)], sorted."""
+    times = []
+    for entry in raw.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        hour, minute = entry.split(':')
+        times.append((int(hour), int(minute)))
+    return sorted(times)
+
+
+def next_run_after(print_times, now):
+    """The first scheduled time strictly after `now`."""
+    for day_offset in (0, 1):
+        day = now.date() + timedelta(days=day_offset)
+        for hour, minute in print_times:
+            candidate = datetime.combine(day, datetime.min.time()).replace(hour=hour, minute=minute)
+            if candidate > now:
+                return candidate
+    return None
+
+
+class PrintDaemon:
+    def __init__(self, config, dry):
+        self.config = config
+        self.dry = dry
+        daemon_config = config['Daemon'] if 'Daemon' in config else {}
+        self.print_times = parse_print_times(daemon_config.get('print_times', DEFAULT_PRINT_TIMES))
+        self.socket_path = daemon_config.get('socket_path', DEFAULT_SOCKET_PATH)
+        prefetch_config = config['Prefetch'] if 'Prefetch' in config else {}
+        self.prefetch_lead = timedelta(minutes=float(prefetch_config.get('lead_minutes', DEFAULT_LEAD_MINUTES)))
+
+        self._printer = None
+        self._print_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.next_run = None
+        self.last_result = "nothing printed yet"
+
+    def _get_printer(self):
+        if self._printer is None:
+            self._printer = RecieptPrinter.from_config(self.config, dry=self.dry)
+        return self._printer
+
+    def print_receipt(self, reason):
+        """Fetch, render and print one morning receipt. Only one print runs
+        at a time; a trigger during a scheduled print waits for it."""
+        with self._print_lock:
+            started = datetime.now()
+            print(f"[{started:%Y-%m-%d %H:%M:%S}] Printing ({reason})")
+            try:
+                context = context_for_print(self.config)
+                p = self._get_printer()
+                render_receipt(p, context, self.config)
+                print_workouts(p, context)
+                printed = p.drain()
+            except Exception as e:
+                traceback.print_exc()
+                # Drop the handle so the next job reopens the device rather
+                # than reusing one stuck in a bad state.
+                self._close_printer()
+                self.last_result = f"failed at {started:%H:%M}: {e}"
+                return False
+            if not printed:
+                self.last_result = f"spooled at {started:%H:%M} ({reason}), printer unavailable: {p.spool.last_error}"
+                return False
+            self.last_result = f"printed at {started:%H:%M} ({reason})"
+            return True
+
+    def _close_printer(self):
+        printer, self._printer = self._printer, None
+        if printer is not None:
+            try:
+                printer.close()
+            except Exception as e:
+                print(f"Error closing printer: {e}")
+
+    def status(self):
+        next_run = f"{self.next_run:%a %H:%M}" if self.next_run else "none"
+        return f"next scheduled print: {next_run}; last: {self.last_result}"
+
+    def prefetch(self):
+        try:
+            prefetch(self.config)
+            print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] Prefetched data for the next print")
+        except Exception:
+            traceback.print_exc()
+
+    def _scheduler_loop(self):
+        self.next_run = next_run_after(self.print_times, datetime.now())
+        prefetched_for = None
+        while not self._stop.is_set() and self.next_run is not None:
+            now = datetime.now()
+            if now >= self.next_run:
+                self.print_receipt("scheduled")
+                self.next_run = next_run_after(self.print_times, datetime.now())
+                continue
+            prefetch_at = self.next_run - self.prefetch_lead
+            if now >= prefetch_at and prefetched_for != self.next_run:
+                self.prefetch()
+                prefetched_for = self.next_run
+                continue
+
+            wake_at = self.next_run if prefetched_for == self.next_run else prefetch_at
+            remaining = (wake_at - now).total_seconds()
+            self._stop.wait(min(max(remaining, 0), SCHEDULER_TICK_SECONDS))
+
+    def handle_command(self, command):
+        if command == "print":
+            return "ok" if self.print_receipt("triggered") else f"error: {self.last_result}"
+        if command == "status":
+            return self.status()
+        return f"error: unknown command '{command}' (expected one of {', '.join(COMMANDS)})"
+
+    def run(self):
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                command = self.rfile.readline().decode("utf-8").strip()
+                self.wfile.write((daemon.handle_command(command) + "\n").encode("utf-8"))
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        server.daemon_threads = True
+        # systemd/kill stop the daemon with SIGTERM; shut the server down
+        # (from another thread, as shutdown() blocks) so cleanup below runs.
+        signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+
+        if not self.dry:
+            # Opening the printer resumes any jobs a crash left in the spool.
+            try:
+                self._get_printer()
+            except Exception:
+                traceback.print_exc()
+
+        scheduler = threading.Thread(target=self._scheduler_loop, name="scheduler", daemon=True)
+        scheduler.start()
+        times = ", ".join(f"{h:02d}:{m:02d}" for h, m in self.print_times)
+        print(f"Daemon listening on {self.socket_path}, printing daily at {times}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._stop.set()
+            server.server_close()
+            os.unlink(self.socket_path)
+            self._close_printer()
+
+
+def send_command(socket_path, command):
+    """Send `command` to a running daemon and return its one-line reply."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(f"{command}\n".encode("utf-8"))
+        reply = b""
+        while not reply.endswith(b"\n"):
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            reply += chunk
+    return reply.decode("utf-8").strip()
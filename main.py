@@ -1,24 +1,61 @@
 import argparse
 import configparser
+import sys
 
 from RecieptPrinter import RecieptPrinter
-from tasks_printer.context import build_context
+from startup_profile import phase, profile_startup
+from daemon import COMMANDS, DEFAULT_SOCKET_PATH, PrintDaemon, send_command
+from tasks_printer.prefetch import context_for_print, prefetch
 from tasks_printer.printer import render_receipt
+from tasks_printer.snapshot import load_snapshot, save_snapshot
 from workout_printer.printer import print_workouts
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--dry", action="store_true", help="Print to console only, skip the physical printer")
+    parser.add_argument("--snapshot", metavar="PATH", help="Save the fetched data to PATH (gzipped if it ends in .gz)")
+    parser.add_argument("--replay", metavar="PATH", help="Render from a saved snapshot instead of fetching anything")
+    parser.add_argument("--prefetch", action="store_true",
+                        help="Fetch and save today's data for the next print, without printing")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Run with the other arguments and report per-module import time")
+    parser.add_argument("--daemon", action="store_true", help="Stay resident and print on the [Daemon] schedule")
+    parser.add_argument("--trigger", metavar="COMMAND", choices=COMMANDS,
+                        help="Send a command (print, status) to a running daemon")
     args = parser.parse_args()
 
+    if args.profile_startup:
+        sys.exit(profile_startup([arg for arg in sys.argv[1:] if arg != "--profile-startup"]))
+
     config = configparser.ConfigParser(interpolation=None)
     config.read("config.ini")
 
-    context = build_context(config)
-    p = RecieptPrinter(dry=args.dry)
+    if args.trigger:
+        daemon_config = config['Daemon'] if 'Daemon' in config else {}
+        print(send_command(daemon_config.get('socket_path', DEFAULT_SOCKET_PATH), args.trigger))
+        return
+
+    if args.daemon:
+        PrintDaemon(config, dry=args.dry).run()
+        return
+
+    if args.prefetch:
+        prefetch(config)
+        return
+
+    if args.replay:
+        context = load_snapshot(args.replay)
+    else:
+        context = context_for_print(config)
+        if args.snapshot:
+            save_snapshot(context, args.snapshot)
+
+    with phase("open printer"):
+        p = RecieptPrinter.from_config(config, dry=args.dry)
     render_receipt(p, context, config)
     print_workouts(p, context)
+    p.close()
 
 
 if __name__ == "__main__":
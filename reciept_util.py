@@ -1,4 +1,99 @@
-import emoji
+import os
+import re
+import threading
+from concurrent.futures import Future
+from functools import lru_cache
+from pathlib import Path
+
+# Everything the printer persists between runs (feed caches, indexes, ...)
+# lives under here. Relative, like config.ini, so it lands next to the checkout.
+CACHE_DIR = Path(os.environ.get("RECIEPT_CACHE_DIR", "cache"))
+
+
+# Separates names in filter_emojis_many's single joined pass; can't occur in
+# a name, and isn't an emoji code point.
+_BATCH_SEPARATOR = "\x00"
+
+
+@lru_cache(maxsize=None)
+def _emoji_pattern():
+    """One compiled character class over emoji_ranges, built on first use.
+    Keycaps (1️⃣, #️⃣) are matched whole since their base is plain ASCII."""
+    from emoji_ranges import EMOJI_RANGES
+
+    char_class = "".join(f"{chr(start)}-{chr(end)}" for start, end in EMOJI_RANGES)
+    return re.compile(f"[#*0-9]\ufe0f?\u20e3|[{char_class}]+")
+
 
 def filter_emojis(string):
-    return emoji.replace_emoji(string, replace='')
+    # Every emoji code point is non-ASCII, so plain names skip the regex.
+    if string.isascii():
+        return string
+    return _emoji_pattern().sub('', string)
+
+
+def filter_emojis_many(strings):
+    """filter_emojis over a list of strings, with a single regex pass over
+    all the non-ASCII ones joined together."""
+    strings = list(strings)
+    indexes = [i for i, string in enumerate(strings) if not string.isascii()]
+    if not indexes:
+        return strings
+
+    batch = [strings[i] for i in indexes]
+    if any(_BATCH_SEPARATOR in string for string in batch):
+        cleaned = [filter_emojis(string) for string in batch]
+    else:
+        cleaned = _emoji_pattern().sub('', _BATCH_SEPARATOR.join(batch)).split(_BATCH_SEPARATOR)
+
+    for i, string in zip(indexes, cleaned):
+        strings[i] = string
+    return strings
+
+
+def is_true(value):
+    """A config flag: 1/true/yes/on, in any case, is true."""
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+
+def cache_subdir(*parts):
+    """Directory under CACHE_DIR (not created). Like cache_path, it reads
+    CACHE_DIR when called, so every user agrees on where the cache is."""
+    return CACHE_DIR.joinpath(*parts)
+
+
+def cache_path(*parts):
+    """Path under CACHE_DIR, creating its parent directory."""
+    path = CACHE_DIR.joinpath(*parts)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def atomic_write(path, data):
+    """Write `data` (str or bytes) to `path` via a temp file + rename, so a
+    crash mid-write never leaves a truncated cache entry behind."""
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def start_daemon_job(fn):
+    """Run `fn` on a daemon thread and return a Future for its result.
+
+    Daemon threads (rather than a ThreadPoolExecutor) so a job that hangs
+    can't keep the process alive after the receipt prints.
+    """
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
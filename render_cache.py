@@ -0,0 +1,182 @@
+"""Render-once, print-many caching for receipts.
+
+Two levels, both keyed by a content hash of exactly what the output depends
+on (the module's slice of the DailyContext, its config, today's date for
+dated modules, and the render code/templates themselves):
+
+- Module output: what a module printed, recorded as a list of printer
+  calls. A module whose key is unchanged isn't run at all; its calls are
+  replayed onto the printer.
+- Whole receipts: the encoded ESC/POS bytes of a receipt, captured from a
+  buffered RecieptPrinter. A reprint with the same key writes those bytes
+  straight to the device without touching any module.
+
+Entries live in memory (kept warm by the daemon) and under cache/render/,
+so reprints from a fresh process hit the cache too.
+"""
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+
+from reciept_util import atomic_write, cache_path, cache_subdir
+
+RENDER_CACHE_DIR = "render"
+RETENTION_DAYS = 7
+
+ROOT_DIR = Path(__file__).parent
+# Files whose contents decide how a receipt is drawn. Editing any of them
+# must never replay output rendered by the old version.
+RENDER_CODE_GLOBS = [
+    "RecieptPrinter.py",
+    "render_cache.py",
+    "templating.py",
+    "tasks_printer/printer.py",
+    "tasks_printer/jinja_env.py",
+    # The templates call into the models (tasks_today, bucketing, ...).
+    "tasks_printer/data_handlers/models.py",
+    "tasks_printer/modules/*.py",
+    "tasks_printer/templates/*.jinja",
+    "workout_printer/printer.py",
+    "workout_printer/templates/*.jinja",
+    "workout_printer/workouts/*.jinja",
+]
+
+
+def code_fingerprint():
+    """Hash of the render code's mtimes. Re-read on every call (a stat per
+    file) so the daemon never keys new output with an old fingerprint;
+    callers take it once per receipt."""
+    stamps = sorted(
+        (str(path.relative_to(ROOT_DIR)), path.stat().st_mtime_ns)
+        for pattern in RENDER_CODE_GLOBS for path in ROOT_DIR.glob(pattern)
+    )
+    return content_hash(stamps)
+
+
+def content_hash(*parts):
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class RecordingPrinter:
+    """Stands in for a RecieptPrinter and records every call made on it."""
+
+    def __init__(self):
+        self.calls = []
+
+    def set_with_default(self, **kwargs):
+        self.calls.append(['set_with_default', [], kwargs])
+
+    def set(self, **kwargs):
+        self.calls.append(['set', [], kwargs])
+
+    def text(self, string, wrap=False):
+        self.calls.append(['text', [string], {'wrap': wrap} if wrap else {}])
+
+    def cut(self):
+        self.calls.append(['cut', [], {}])
+
+
+def replay(calls, p):
+    for method, args, kwargs in calls:
+        getattr(p, method)(*args, **kwargs)
+
+
+class RenderCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._receipts = {}
+
+    def _path(self, key, suffix):
+        return cache_path(RENDER_CACHE_DIR, f"{key}{suffix}")
+
+    def get_calls(self, key):
+        with self._lock:
+            calls = self._calls.get(key)
+        if calls is None:
+            try:
+                calls = json.loads(self._path(key, ".json").read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                return None
+            with self._lock:
+                self._calls[key] = calls
+        return calls
+
+    def put_calls(self, key, calls):
+        with self._lock:
+            self._calls[key] = calls
+        atomic_write(self._path(key, ".json"), json.dumps(calls))
+
+    def get_receipt(self, key):
+        with self._lock:
+            data = self._receipts.get(key)
+        if data is None:
+            try:
+                data = self._path(key, ".bin").read_bytes()
+            except OSError:
+                return None
+            with self._lock:
+                self._receipts[key] = data
+        return data
+
+    def put_receipt(self, key, data):
+        with self._lock:
+            self._receipts[key] = data
+        atomic_write(self._path(key, ".bin"), data)
+
+    def prune(self):
+        """Drop entries older than RETENTION_DAYS, on disk and (for the
+        daemon) in memory."""
+        cutoff = time.time() - RETENTION_DAYS * 86400
+        for path in cache_subdir(RENDER_CACHE_DIR).glob("*"):
+            try:
+                if path.stat().st_mtime >= cutoff:
+                    continue
+                path.unlink()
+            except OSError:
+                continue
+            with self._lock:
+                self._calls.pop(path.stem, None)
+                self._receipts.pop(path.stem, None)
+
+
+render_cache = RenderCache()
+
+
+def render_module(p, key, render):
+    """Run `render(printer)` through the module-output cache: on a hit the
+    recorded calls are replayed onto `p` and `render` is never called."""
+    calls = render_cache.get_calls(key)
+    if calls is None:
+        recorder = RecordingPrinter()
+        render(recorder)
+        calls = recorder.calls
+        render_cache.put_calls(key, calls)
+    replay(calls, p)
+
+
+def print_receipt(p, key, render):
+    """Print one receipt through the byte cache. On a hit its cached ESC/POS
+    bytes are sent as-is; otherwise `render(p)` runs and, if `p` can capture
+    its output, the bytes are cached for next time.
+
+    Every receipt prunes the cache first, including dry and unbuffered runs
+    that only add module entries."""
+    render_cache.prune()
+    if p.can_capture:
+        data = render_cache.get_receipt(key)
+        if data is not None:
+            p.raw(data)
+            print(f"Reprinted cached receipt ({len(data)} bytes)")
+            return
+
+    p.start_capture()
+    try:
+        render(p)
+    finally:
+        data = p.stop_capture()
+    if data:
+        render_cache.put_receipt(key, data)
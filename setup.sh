@@ -6,3 +6,4 @@ sudo usermod -a -G lp pi
 python3 -m venv --without-pip .
 ./bin/python -m ensurepip --upgrade
 ./bin/pip install -r requirements.txt
+./bin/python templating.py --precompile
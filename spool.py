@@ -0,0 +1,155 @@
+"""Print-job spool between rendering and the printer.
+
+Every receipt (the daily receipt, each workout) is written to
+cache/spool/ as one job of encoded ESC/POS bytes before anything is sent.
+A single worker thread drains the jobs in order, reopening the device and
+backing off when a write fails (USB unplugged, printer off, paper door
+open), and only deletes a job once all of its bytes were written. Jobs
+still on disk after a crash or power loss are picked up again by the next
+spool that's created, so they print on restart.
+
+A job interrupted part-way is resent from its first byte: a receipt can
+come out twice, but never half-printed and then dropped.
+"""
+import threading
+import time
+import traceback
+from collections import deque
+
+from reciept_util import atomic_write, cache_path, cache_subdir
+
+SPOOL_DIR = "spool"
+JOB_SUFFIX = ".job"
+DEFAULT_RETRIES = 5
+DEFAULT_RETRY_BACKOFF = 2.0
+MAX_RETRY_BACKOFF = 60.0
+
+
+def _send_errors():
+    from escpos.exceptions import Error as EscposError
+
+    # usb.core.USBError is an IOError; socket errors are OSErrors.
+    return (OSError, EscposError)
+
+
+class PrintSpool:
+    def __init__(self, open_device, write_size, retries=DEFAULT_RETRIES, retry_backoff=DEFAULT_RETRY_BACKOFF):
+        """`open_device` returns a fresh escpos device; it's called lazily,
+        and again after every failed write."""
+        self.open_device = open_device
+        self.write_size = write_size
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.last_error = None
+
+        self._device = None
+        self._cond = threading.Condition()
+        self._worker = None
+        self._pending = deque(sorted(cache_subdir(SPOOL_DIR).glob(f"*{JOB_SUFFIX}")))
+        self._last_name = self._pending[-1].name if self._pending else ""
+        if self._pending:
+            print(f"Resuming {len(self._pending)} spooled print job(s)")
+            with self._cond:
+                self._start_worker()
+
+    @classmethod
+    def from_config(cls, printer_config, open_device, write_size):
+        return cls(
+            open_device,
+            write_size,
+            retries=int(printer_config.get('spool_retries', DEFAULT_RETRIES)),
+            retry_backoff=float(printer_config.get('spool_retry_backoff', DEFAULT_RETRY_BACKOFF)),
+        )
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def submit(self, data):
+        """Persist `data` as a new job and wake the worker."""
+        with self._cond:
+            # Nanosecond timestamps keep jobs in submission order across
+            # restarts; the bump covers two jobs in the same tick.
+            name = f"{time.time_ns():020d}{JOB_SUFFIX}"
+            if name <= self._last_name:
+                name = f"{int(self._last_name[:-len(JOB_SUFFIX)]) + 1:020d}{JOB_SUFFIX}"
+            self._last_name = name
+            path = cache_path(SPOOL_DIR, name)
+            atomic_write(path, data)
+            self._pending.append(path)
+            self._start_worker()
+
+    def _start_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._drain_loop, name="print-spool", daemon=True)
+            self._worker.start()
+
+    def _drain_loop(self):
+        try:
+            while True:
+                with self._cond:
+                    if not self._pending:
+                        # Cleared under the same lock as the check, so a
+                        # submit() right after this starts a new worker.
+                        self._worker = None
+                        return
+                    path = self._pending[0]
+                if not self._send_with_retry(path):
+                    # Leave it (and everything after it) on disk; the next
+                    # submit or the next run tries again.
+                    return
+                path.unlink(missing_ok=True)
+                with self._cond:
+                    self._pending.popleft()
+        except Exception as e:
+            # Not a printer error we know how to retry; keep the job for the
+            # next run rather than lose it.
+            self.last_error = f"{type(e).__name__}: {e}"
+            traceback.print_exc()
+        finally:
+            # Also reached if the device raised something unexpected, so
+            # drain() never waits on a worker that's gone.
+            with self._cond:
+                if self._worker is threading.current_thread():
+                    self._worker = None
+                self._cond.notify_all()
+
+    def _send_with_retry(self, path):
+        errors = _send_errors()
+        data = path.read_bytes()
+        delay = self.retry_backoff
+        for attempt in range(self.retries + 1):
+            try:
+                if self._device is None:
+                    self._device = self.open_device()
+                for start in range(0, len(data), self.write_size):
+                    self._device._raw(data[start:start + self.write_size])
+                self.last_error = None
+                return True
+            except errors as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"Print job {path.name} failed ({self.last_error}), attempt {attempt + 1}/{self.retries + 1}")
+                self._close_device()
+                if attempt < self.retries:
+                    time.sleep(delay)
+                    delay = min(delay * 2, MAX_RETRY_BACKOFF)
+        return False
+
+    def _close_device(self):
+        device, self._device = self._device, None
+        if device is not None:
+            try:
+                device.close()
+            except Exception:
+                pass
+
+    def drain(self, timeout=None):
+        """Wait for the worker to finish. True if every job was printed,
+        False if some are still spooled (see last_error)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._worker is None or not self._pending, timeout=timeout)
+            return not self._pending
+
+    def close(self):
+        self.drain()
+        self._close_device()
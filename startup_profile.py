@@ -0,0 +1,96 @@
+"""`main.py --profile-startup`: where does a run's startup time go?
+
+The run is repeated in a child interpreter under `python -X importtime`,
+whose per-module import timings are summarized here. Code that wants its own
+non-import startup cost in the report (template loading, opening the printer)
+wraps it in `phase()`, which reports to the profiling parent only when
+running under it and costs nothing otherwise.
+"""
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+PROFILE_ENV_VAR = "RECIEPT_PROFILE_STARTUP"
+PHASE_PREFIX = "startup phase:"
+REPORT_TOP_N = 15
+
+
+@contextmanager
+def phase(name):
+    if not os.environ.get(PROFILE_ENV_VAR):
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_us = int((time.perf_counter() - started) * 1_000_000)
+        print(f"{PHASE_PREFIX} {elapsed_us} | {name}", file=sys.stderr)
+
+
+def parse_importtime(stderr):
+    """`-X importtime` output -> `[(module, self_us, cumulative_us, depth)]`,
+    in import order. Other stderr lines are ignored."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        imports.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return imports
+
+
+def parse_phases(stderr):
+    phases = []
+    for line in stderr.splitlines():
+        if line.startswith(PHASE_PREFIX):
+            elapsed_us, name = line[len(PHASE_PREFIX):].split("|", 1)
+            phases.append((name.strip(), int(elapsed_us)))
+    return phases
+
+
+def run_profiled(argv, cwd=None):
+    """Run main.py with `argv` under -X importtime; returns (returncode, stderr)."""
+    main_path = Path(__file__).resolve().parent / "main.py"
+    env = {**os.environ, PROFILE_ENV_VAR: "1"}
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", str(main_path), *argv],
+        stderr=subprocess.PIPE, text=True, env=env, cwd=cwd,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    return result.returncode, result.stderr, wall_ms
+
+
+def profile_startup(argv):
+    returncode, stderr, wall_ms = run_profiled(argv)
+
+    imports = parse_importtime(stderr)
+    top_level = [entry for entry in imports if entry[3] == 0]
+    total_import_ms = sum(cumulative for _, _, cumulative, _ in top_level) / 1000
+
+    print()
+    print(f"Startup profile (whole run {wall_ms:.0f} ms, imports {total_import_ms:.0f} ms)")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module (nested imports listed above, indented)")
+    slowest = set(sorted(imports, key=lambda e: -e[2])[:REPORT_TOP_N])
+    for entry in imports:
+        if entry in slowest:
+            name, self_us, cumulative_us, depth = entry
+            print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {'  ' * depth}{name}")
+
+    phases = parse_phases(stderr)
+    if phases:
+        print()
+        print(f"{'ms':>14}  phase")
+        for name, elapsed_us in phases:
+            print(f"{elapsed_us / 1000:14.1f}  {name}")
+
+    other_stderr = [line for line in stderr.splitlines()
+                    if not line.startswith(("import time:", PHASE_PREFIX))]
+    if other_stderr:
+        print("\n".join(other_stderr), file=sys.stderr)
+    return returncode
@@ -1,18 +1,30 @@
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import List, Optional
 from zoneinfo import ZoneInfo
 
-from .data_handlers.ical_calendar_api import fetch_todays_events
-from .data_handlers.models import Event, Project
-from .data_handlers.ticktick_api import TickTickAPI
-from .data_handlers.weather_api import WeatherData, fetch_weather
+from reciept_util import filter_emojis_many, is_true, start_daemon_job
+from .data_handlers.models import Event, Project, WeatherData
 
-PROJECT_FILTER = ['Out of House', 'House', 'Computer']
-SUBTASK_DISP_MAX = 5
-SUBTASK_DISP_IF_COMPLETE = False
+# The data handlers themselves (and requests, icalendar, ... under them) are
+# imported inside build_context, only for the sources that are configured.
 
-TICKTICK_EVENTS_DAYS_AHEAD = 2
+# Which TickTick tasks are fetched is set in [ModuleTickTick]; see TaskQuery.
+# How far ahead ticktick_event_project is read is set in [ModuleSchedule].
+DEFAULT_TICKTICK_EVENT_DAYS_AHEAD = 2
+
+# Seconds each data source gets before build_context gives up on it and
+# records a timeout error instead. Overridable per module with `fetch_deadline`.
+DEFAULT_FETCH_DEADLINE = 20
+
+# The independently fetchable parts of a DailyContext. `schedule` covers
+# both iCal feeds and TickTick events.
+SOURCES = ('ticktick', 'weather', 'schedule')
+
+# Reported in events_errors when no schedule source is configured at all.
+SCHEDULE_NOT_CONFIGURED = "Schedule config missing ical_urls/ticktick_event_project"
 
 
 @dataclass
@@ -23,78 +35,189 @@ class DailyContext:
     weather_error: Optional[str] = None
     events: List[Event] = field(default_factory=list)
     events_errors: List[str] = field(default_factory=list)
+    # When the data was captured, for a context replayed from a snapshot;
+    # None means the receipt is for right now.
+    now: Optional[datetime] = None
+
+    def current_time(self):
+        """The time the receipt is printed as of: the header date and the
+        age of a stale forecast are rendered relative to it."""
+        return self.now or datetime.now().astimezone()
 
 
 def _parse_url_list(raw):
     return [url.strip() for url in raw.split(',') if url.strip()]
 
 
-def _fetch_ticktick_events(bearer_token, project_name, timezone):
+def _fetch_ticktick_events(api, project_name, timezone, days_ahead=DEFAULT_TICKTICK_EVENT_DAYS_AHEAD):
     """TickTick tasks (from `project_name`) that fall on today, in local time."""
-    api = TickTickAPI(bearer_token)
-    raw_events = api.get_events_from_project(project_name, days_ahead=TICKTICK_EVENTS_DAYS_AHEAD)
+    raw_events = api.get_events_from_project(project_name, days_ahead=days_ahead)
 
     tz = ZoneInfo(timezone)
     today = datetime.now(tz).date()
     return [e for e in raw_events if e.start_time.astimezone(tz).date() == today]
 
 
-def build_context(config) -> DailyContext:
+def _run_jobs(jobs):
+    """Run every `(name, fn, deadline)` job concurrently.
+
+    Returns `{name: (result, error)}`. Each deadline is measured from when
+    the batch started, so the whole fetch takes at most the longest deadline.
+    """
+    started = time.monotonic()
+    futures = [(name, start_daemon_job(fn), deadline) for name, fn, deadline in jobs]
+
+    results = {}
+    for name, future, deadline in futures:
+        remaining = max(deadline - (time.monotonic() - started), 0)
+        try:
+            results[name] = (future.result(timeout=remaining), None)
+        except FutureTimeoutError:
+            results[name] = (None, f"timed out after {deadline:g}s")
+        except Exception as e:
+            results[name] = (None, e)
+    return results
+
+
+def _strip_emojis(context):
+    """Remove emojis (which the printer can't print) from every task,
+    subtask and event name, in one batched pass over the whole context."""
+    tasks = [task for project in context.projects for task in project.tasks]
+    named = tasks + [subtask for task in tasks for subtask in task.subtasks] + context.events
+    for item, name in zip(named, filter_emojis_many(item.name for item in named)):
+        item.name = name
+
+
+def _fetch_deadline(module_config):
+    return float(module_config.get('fetch_deadline', DEFAULT_FETCH_DEADLINE))
+
+
+def build_context(config, sources=SOURCES) -> DailyContext:
+    """Fetch every configured data source in parallel into a DailyContext.
+
+    A source that fails or misses its deadline only fills in its own error
+    field; the rest of the receipt still renders from whatever came back.
+    Sources not listed in `sources` are skipped and left empty.
+    """
     context = DailyContext()
+    jobs = []
 
     ticktick_config = config['ModuleTickTick'] if 'ModuleTickTick' in config else {}
+    schedule_config = config['ModuleSchedule'] if 'ModuleSchedule' in config else {}
+    ticktick_event_project = schedule_config.get('ticktick_event_project') if 'schedule' in sources else None
     ticktick_bearer_token = ticktick_config.get('bearer_token')
-    if not ticktick_bearer_token:
-        context.ticktick_error = "TickTick config missing bearer_token"
-    else:
-        try:
-            api = TickTickAPI(ticktick_bearer_token)
-            context.projects = api.get_tasks_from_projects(
-                PROJECT_FILTER,
-                max_subtasks=SUBTASK_DISP_MAX,
-                show_completed_subtasks=SUBTASK_DISP_IF_COMPLETE,
-            )
-        except Exception as e:
-            context.ticktick_error = f"TickTick error: {e}"
+    ticktick_api = None
+    task_query = None
+    if ticktick_bearer_token:
+        from .data_handlers.ticktick_api import TaskQuery, TickTickAPI
+        from .data_handlers.transport import HttpSettings
+
+        task_store = None
+        if is_true(ticktick_config.get('task_store', 'true')):
+            from .data_handlers.task_store import TaskStore
+
+            task_store = TaskStore()
+
+        # One client for both the tasks and events jobs, so they share its
+        # project index and the download of a project they both read.
+        task_query = TaskQuery.from_config(ticktick_config)
+        ticktick_api = TickTickAPI(
+            ticktick_bearer_token, HttpSettings.from_config(ticktick_config), task_store, task_query,
+            shared_projects=[ticktick_event_project] if ticktick_event_project else (),
+        )
+    if 'ticktick' in sources:
+        if not ticktick_bearer_token:
+            context.ticktick_error = "TickTick config missing bearer_token"
+        else:
+            jobs.append(('ticktick', lambda: ticktick_api.get_tasks_from_projects(
+                list(task_query.projects),
+                max_subtasks=task_query.max_subtasks,
+                show_completed_subtasks=task_query.show_completed_subtasks,
+            ), _fetch_deadline(ticktick_config)))
 
     weather_config = config['ModuleWeather'] if 'ModuleWeather' in config else {}
-    if 'latitude' not in weather_config or 'longitude' not in weather_config:
-        context.weather_error = "Weather config missing latitude/longitude"
-    else:
-        try:
-            context.weather = fetch_weather(
+    if 'weather' in sources:
+        if 'latitude' not in weather_config or 'longitude' not in weather_config:
+            context.weather_error = "Weather config missing latitude/longitude"
+        else:
+            from .data_handlers.transport import HttpSettings
+            from .data_handlers.weather_api import DEFAULT_CACHE_TTL_MINUTES, fetch_weather
+
+            jobs.append(('weather', lambda: fetch_weather(
                 weather_config['latitude'],
                 weather_config['longitude'],
                 weather_config.get('timezone', 'America/Los_Angeles'),
-            )
-        except Exception as e:
-            context.weather_error = f"Weather data error: {e}"
+                HttpSettings.from_config(weather_config),
+                float(weather_config.get('cache_ttl_minutes', DEFAULT_CACHE_TTL_MINUTES)),
+            ), _fetch_deadline(weather_config)))
 
-    schedule_config = config['ModuleSchedule'] if 'ModuleSchedule' in config else {}
     schedule_timezone = schedule_config.get('timezone', 'America/Los_Angeles')
-    ical_urls = _parse_url_list(schedule_config.get('ical_urls', ''))
-    ticktick_event_project = schedule_config.get('ticktick_event_project')
-
-    events = []
+    schedule_deadline = _fetch_deadline(schedule_config)
+    ical_streaming = schedule_config.get('ical_parse_mode', 'streaming') != 'full'
+    ical_urls = []
+    if 'schedule' in sources:
+        ical_urls = _parse_url_list(schedule_config.get('ical_urls', ''))
 
     if ical_urls:
-        calendar_events, calendar_errors = fetch_todays_events(ical_urls, schedule_timezone)
-        events.extend(calendar_events)
-        context.events_errors.extend(calendar_errors)
+        from .data_handlers.ical_calendar_api import fetch_todays_events
+        from .data_handlers.transport import HttpSettings
+
+        schedule_http = HttpSettings.from_config(schedule_config)
+
+        # One job per calendar so a single slow feed doesn't hold up the others.
+        for i, ical_url in enumerate(ical_urls):
+            jobs.append((f'ical:{i}', lambda url=ical_url: fetch_todays_events(
+                [url], schedule_timezone, schedule_http, ical_streaming), schedule_deadline))
 
     if ticktick_event_project:
         if not ticktick_bearer_token:
             context.events_errors.append("TickTick events configured but bearer_token is missing")
         else:
-            try:
-                events.extend(_fetch_ticktick_events(ticktick_bearer_token, ticktick_event_project, schedule_timezone))
-            except Exception as e:
-                context.events_errors.append(f"TickTick events error: {e}")
+            jobs.append(('ticktick_events', lambda: _fetch_ticktick_events(
+                ticktick_api, ticktick_event_project, schedule_timezone,
+                int(schedule_config.get('ticktick_event_days_ahead', DEFAULT_TICKTICK_EVENT_DAYS_AHEAD)),
+            ), schedule_deadline))
 
-    if not ical_urls and not ticktick_event_project:
-        context.events_errors.append("Schedule config missing ical_urls/ticktick_event_project")
+    if 'schedule' in sources and not ical_urls and not ticktick_event_project:
+        context.events_errors.append(SCHEDULE_NOT_CONFIGURED)
+
+    results = _run_jobs(jobs)
+    events = []
+
+    if 'ticktick' in results:
+        projects, error = results['ticktick']
+        if error is None:
+            context.projects = projects
+            for project in projects:
+                project.bucket_tasks(task_query.late_within_days)
+        else:
+            context.ticktick_error = f"TickTick error: {error}"
+
+    if 'weather' in results:
+        weather, error = results['weather']
+        if error is None:
+            context.weather = weather
+        else:
+            context.weather_error = f"Weather data error: {error}"
+
+    for i in range(len(ical_urls)):
+        result, error = results[f'ical:{i}']
+        if error is None:
+            calendar_events, calendar_errors = result
+            events.extend(calendar_events)
+            context.events_errors.extend(calendar_errors)
+        else:
+            context.events_errors.append(f"Calendar fetch failed: {error}")
+
+    if 'ticktick_events' in results:
+        ticktick_events, error = results['ticktick_events']
+        if error is None:
+            events.extend(ticktick_events)
+        else:
+            context.events_errors.append(f"TickTick events error: {error}")
 
     events.sort(key=lambda e: e.start_time)
     context.events = events
 
+    _strip_emojis(context)
     return context
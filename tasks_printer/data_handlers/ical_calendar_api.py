@@ -1,12 +1,27 @@
-from datetime import datetime, time
+import bisect
+import hashlib
+import json
+import os
+import threading
+import time as time_module
+from datetime import datetime, time, timedelta
 from zoneinfo import ZoneInfo
 
-import icalendar
-import recurring_ical_events
 import requests
 
+from reciept_util import atomic_write, cache_path
+from . import transport
+from .ical_stream import filter_feed
 from .models import Event
 
+ICAL_CACHE_DIR = "ical"
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# How far ahead each feed's recurrences are expanded when its occurrence
+# index is (re)built. The index is reused until the feed changes or today
+# falls outside this window.
+OCCURRENCE_WINDOW_DAYS = 60
+
 
 def _to_local(dt, tz):
     if isinstance(dt, datetime):
@@ -16,35 +31,203 @@ def _to_local(dt, tz):
     return datetime.combine(dt, time.min, tzinfo=tz)
 
 
-def _fetch_calendar_events(ical_url, tz, range_start, range_end):
-    response = requests.get(ical_url)
-    response.raise_for_status()
+def _feed_key(ical_url):
+    # Hash the URL rather than using it: the secret address is a credential.
+    return hashlib.sha256(ical_url.encode("utf-8")).hexdigest()[:24]
 
-    calendar = icalendar.Calendar.from_ical(response.text)
-    occurrences = recurring_ical_events.of(calendar).between(range_start, range_end)
 
-    events = []
-    for component in occurrences:
-        name = str(component.get('SUMMARY', 'Untitled'))
+def _feed_cache_paths(ical_url):
+    key = _feed_key(ical_url)
+    return cache_path(ICAL_CACHE_DIR, f"{key}.ics"), cache_path(ICAL_CACHE_DIR, f"{key}.json")
+
+
+def _read_cached_meta(body_path, meta_path):
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not body_path.exists() or 'feed_hash' not in meta:
+        return None
+    return meta
+
+
+def _save_body(response, body_path):
+    """Stream `response` to `body_path` chunk by chunk, returning the
+    content hash. The body never has to fit in memory all at once."""
+    digest = hashlib.sha256()
+    tmp_path = body_path.with_name(f".{body_path.name}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                f.write(chunk)
+        os.replace(tmp_path, body_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return digest.hexdigest()
+
+
+def _download_calendar(ical_url, http_settings=None):
+    """Return `(body_path, feed_hash, stale_note)` for `ical_url`.
+
+    The last good copy of every feed is kept on disk with its ETag /
+    Last-Modified validators, so an unchanged feed costs a 304 instead of a
+    full download. If the server can't be reached the cached copy is used and
+    `stale_note` says how old it is; otherwise `stale_note` is None.
+    """
+    body_path, meta_path = _feed_cache_paths(ical_url)
+    meta = _read_cached_meta(body_path, meta_path)
+
+    headers = {}
+    if meta is not None:
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+    try:
+        with transport.get(ical_url, http_settings, headers=headers, stream=True) as response:
+            not_modified = response.status_code == 304 and meta is not None
+            if not_modified:
+                feed_hash = meta['feed_hash']
+            else:
+                response.raise_for_status()
+                feed_hash = _save_body(response, body_path)
+    except requests.exceptions.RequestException as e:
+        if meta is None:
+            raise
+        print(f"Calendar fetch failed, falling back to cached copy: {e}")
+        fetched = datetime.fromtimestamp(meta['fetched_at'])
+        return body_path, meta['feed_hash'], f"Calendar offline, using copy from {fetched.strftime('%a %m/%d %I:%M %p')}"
+
+    # Rewritten on a 304 too: the copy was just confirmed current, so a later
+    # offline fallback should date from now. A 304 may omit the validators.
+    previous = meta if not_modified else {}
+    atomic_write(meta_path, json.dumps({
+        'etag': response.headers.get('ETag') or previous.get('etag'),
+        'last_modified': response.headers.get('Last-Modified') or previous.get('last_modified'),
+        'fetched_at': time_module.time(),
+        'feed_hash': feed_hash,
+    }))
+    return body_path, feed_hash, None
+
+
+def _expand_occurrences(body_path, tz, window_start, window_end, streaming=True):
+    """Every occurrence in the feed between the two datetimes, as
+    `(start_ts, end_ts, is_all_day, summary)` tuples sorted by start.
+
+    In streaming mode the feed is prefiltered line by line so only VEVENTs
+    that could land in the window are handed to icalendar at all.
+    """
+    # Only needed when an index is rebuilt, so a run where every feed's
+    # index is still valid never imports the iCal stack.
+    import icalendar
+    import recurring_ical_events
+
+    if streaming:
+        text = filter_feed(body_path, window_start, window_end)
+    else:
+        text = body_path.read_text(encoding="utf-8", errors="replace")
+    calendar = icalendar.Calendar.from_ical(text)
+    occurrences = []
+    for component in recurring_ical_events.of(calendar).between(window_start, window_end):
         dtstart = component['DTSTART'].dt
-        is_all_day = not isinstance(dtstart, datetime)
         dtend = component['DTEND'].dt if 'DTEND' in component else dtstart
+        occurrences.append((
+            _to_local(dtstart, tz).timestamp(),
+            _to_local(dtend, tz).timestamp(),
+            not isinstance(dtstart, datetime),
+            str(component.get('SUMMARY', 'Untitled')),
+        ))
+    occurrences.sort(key=lambda o: o[0])
+    return occurrences
+
+
+def _build_index(body_path, feed_hash, tz, day, streaming):
+    window_start = datetime.combine(day, time.min, tzinfo=tz)
+    window_end = window_start + timedelta(days=OCCURRENCE_WINDOW_DAYS)
+    occurrences = _expand_occurrences(body_path, tz, window_start, window_end, streaming)
+    return {
+        'feed_hash': feed_hash,
+        'timezone': str(tz),
+        'streaming': streaming,
+        'window_start': window_start.timestamp(),
+        'window_end': window_end.timestamp(),
+        # Longest occurrence, so a lookup knows how far before the range
+        # start an overlapping occurrence could begin.
+        'max_span': max((end - start for start, end, _, _ in occurrences), default=0),
+        'starts': [o[0] for o in occurrences],
+        'occurrences': occurrences,
+    }
+
+
+def _load_index(index_path, feed_hash, tz, range_start, range_end, streaming):
+    try:
+        index = json.loads(index_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if (index.get('feed_hash') != feed_hash or index.get('timezone') != str(tz)
+            or index.get('streaming') != streaming
+            or range_start.timestamp() < index['window_start']
+            or range_end.timestamp() > index['window_end']):
+        return None
+    return index
+
 
+def _occurrence_index(ical_url, body_path, feed_hash, tz, range_start, range_end, streaming):
+    """The feed's occurrence index, rebuilt only when the feed content,
+    timezone, parse mode, or window no longer covers the requested range."""
+    index_path = cache_path(ICAL_CACHE_DIR, f"{_feed_key(ical_url)}.index.json")
+
+    index = _load_index(index_path, feed_hash, tz, range_start, range_end, streaming)
+    if index is None:
+        index = _build_index(body_path, feed_hash, tz, range_start.date(), streaming)
+        atomic_write(index_path, json.dumps(index, separators=(',', ':')))
+    return index
+
+
+def _occurrences_between(index, range_start, range_end):
+    """Occurrences overlapping [range_start, range_end], found by bisecting
+    the sorted start times instead of re-expanding the feed."""
+    start_ts = range_start.timestamp()
+    end_ts = range_end.timestamp()
+    lo = bisect.bisect_left(index['starts'], start_ts - index['max_span'])
+    hi = bisect.bisect_right(index['starts'], end_ts)
+    return [
+        occurrence for occurrence in index['occurrences'][lo:hi]
+        # Zero-length occurrences at the range start still count, matching
+        # recurring_ical_events.between().
+        if occurrence[1] > start_ts or occurrence[0] >= start_ts
+    ]
+
+
+def _fetch_calendar_events(ical_url, tz, range_start, range_end, http_settings=None, streaming=True):
+    """Return `(events, stale_note)` for one feed; see `_download_calendar`."""
+    body_path, feed_hash, stale_note = _download_calendar(ical_url, http_settings)
+    index = _occurrence_index(ical_url, body_path, feed_hash, tz, range_start, range_end, streaming)
+
+    events = []
+    for start_ts, end_ts, is_all_day, name in _occurrences_between(index, range_start, range_end):
         events.append(Event(
             name,
-            _to_local(dtstart, tz),
-            end_time=_to_local(dtend, tz),
+            datetime.fromtimestamp(start_ts, tz),
+            end_time=datetime.fromtimestamp(end_ts, tz),
             is_all_day=is_all_day,
         ))
-    return events
+    return events, stale_note
 
 
-def fetch_todays_events(ical_urls, timezone='America/Los_Angeles'):
+def fetch_todays_events(ical_urls, timezone='America/Los_Angeles', http_settings=None, streaming=True):
     """Fetch today's events from one or more secret iCal URLs.
 
     Each URL is fetched independently so one broken/unreachable calendar
     doesn't prevent the others from showing up; failures are collected
-    and returned alongside whatever events did come back.
+    and returned alongside whatever events did come back. A calendar served
+    from its offline cache also contributes a staleness note to the errors.
+
+    `streaming` selects the line-by-line prefilter (see ical_stream) over
+    parsing each whole feed with icalendar.
     """
     tz = ZoneInfo(timezone)
     today = datetime.now(tz).date()
@@ -55,7 +238,11 @@ def fetch_todays_events(ical_urls, timezone='America/Los_Angeles'):
     errors = []
     for ical_url in ical_urls:
         try:
-            events.extend(_fetch_calendar_events(ical_url, tz, range_start, range_end))
+            calendar_events, stale_note = _fetch_calendar_events(
+                ical_url, tz, range_start, range_end, http_settings, streaming)
+            events.extend(calendar_events)
+            if stale_note:
+                errors.append(stale_note)
         except Exception as e:
             errors.append(f"Calendar fetch failed: {e}")
 
@@ -0,0 +1,136 @@
+"""Line-by-line prefilter for large iCal feeds.
+
+`filter_feed` reads a feed from disk one line at a time and returns a much
+smaller VCALENDAR containing only the VEVENTs that could produce an
+occurrence inside a date window (plus every VTIMEZONE and calendar-level
+property the recurrence expander needs). Only one VEVENT is held in memory
+at a time, so peak memory tracks the window, not the calendar's history.
+"""
+from datetime import date, timedelta
+
+# Slack around the window, in days, so floating/TZID times that land on a
+# different date once converted to local time are never dropped.
+DATE_SLACK_DAYS = 1
+
+
+def _split_property(line):
+    """`NAME;PARAM=x:VALUE` -> ("NAME", "VALUE"). Colons inside quoted
+    parameter values don't end the name/params part."""
+    in_quotes = False
+    for i, char in enumerate(line):
+        if char == '"':
+            in_quotes = not in_quotes
+        elif char == ':' and not in_quotes:
+            head, value = line[:i], line[i + 1:]
+            return head.split(';', 1)[0].upper(), value
+    return line.upper(), ''
+
+
+def _parse_date(value):
+    """The date part of a DATE or DATE-TIME value, or None if unparseable."""
+    try:
+        return date(int(value[0:4]), int(value[4:6]), int(value[6:8]))
+    except (ValueError, IndexError):
+        return None
+
+
+def _rrule_until(value):
+    for part in value.split(';'):
+        key, _, rule_value = part.partition('=')
+        if key.upper() == 'UNTIL':
+            return _parse_date(rule_value)
+    return None
+
+
+def _event_in_window(properties, first_day, last_day):
+    """Whether a VEVENT with these `{NAME: [values]}` could occur between
+    `first_day` and `last_day`. Errs on the side of keeping the event."""
+    dtstart = _parse_date(properties['DTSTART'][0]) if 'DTSTART' in properties else None
+    if dtstart is None:
+        return True
+
+    if 'RRULE' in properties:
+        until = _rrule_until(properties['RRULE'][0])
+        return until is None or until >= first_day
+    if 'RDATE' in properties:
+        return True
+
+    if 'RECURRENCE-ID' in properties:
+        # An override matters if either the original slot or the moved one
+        # touches the window (the former so the master's copy is suppressed).
+        recurrence_day = _parse_date(properties['RECURRENCE-ID'][0])
+        if recurrence_day is None or first_day <= recurrence_day <= last_day:
+            return True
+
+    end = dtstart
+    if 'DTEND' in properties:
+        end = _parse_date(properties['DTEND'][0]) or dtstart
+    elif 'DURATION' in properties:
+        from icalendar.prop import vDuration
+        try:
+            end = dtstart + vDuration.from_ical(properties['DURATION'][0])
+        except ValueError:
+            return True
+    return dtstart <= last_day and end >= first_day
+
+
+def _unfolded_lines(f):
+    """Logical content lines of an RFC 5545 file, with folding undone."""
+    pending = None
+    for raw in f:
+        line = raw.rstrip('\r\n')
+        if line[:1] in (' ', '\t'):
+            if pending is not None:
+                pending += line[1:]
+            continue
+        if pending is not None:
+            yield pending
+        pending = line
+    if pending:
+        yield pending
+
+
+def filter_feed(path, window_start, window_end):
+    """Return VCALENDAR text from the feed at `path` holding only the
+    components relevant to [window_start, window_end] (datetimes)."""
+    first_day = window_start.date() - timedelta(days=DATE_SLACK_DAYS)
+    last_day = window_end.date() + timedelta(days=DATE_SLACK_DAYS)
+
+    out = []
+    block = None
+    block_name = None
+    block_depth = 0
+    event_properties = None
+    depth = 0
+
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in _unfolded_lines(f):
+            name, value = _split_property(line)
+
+            if name == 'BEGIN':
+                depth += 1
+                if block is None and depth == 2:
+                    block_name = value.strip().upper()
+                    block_depth = depth
+                    block = [line]
+                    event_properties = {} if block_name == 'VEVENT' else None
+                    continue
+            elif name == 'END':
+                depth -= 1
+
+            if block is None:
+                out.append(line)
+                continue
+
+            block.append(line)
+            if event_properties is not None and depth == block_depth and name != 'END':
+                event_properties.setdefault(name, []).append(value)
+
+            if name == 'END' and depth == block_depth - 1:
+                if block_name == 'VTIMEZONE' or (
+                        block_name == 'VEVENT' and _event_in_window(event_properties, first_day, last_day)):
+                    out.extend(block)
+                block = None
+                event_properties = None
+
+    return '\r\n'.join(out) + '\r\n'
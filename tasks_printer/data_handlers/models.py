@@ -1,12 +1,23 @@
-from datetime import datetime, timezone
-from reciept_util import filter_emojis
+from dataclasses import InitVar, dataclass, field
+from datetime import date, datetime, timezone
+from typing import List, Optional
 
+# Tasks up to this many days overdue are listed with today's; older ones
+# are only offered for rescheduling.
+DEFAULT_LATE_WITHIN_DAYS = 3
+
+
+# eq=False keeps identity hashing: the schedule module keys dicts by Event.
+@dataclass(slots=True, eq=False)
 class Event:
-    def __init__(self, name, start_time, end_time=None, is_all_day=False):
-        self.name = filter_emojis(name)
-        self.start_time = start_time
-        self.end_time = end_time if end_time is not None else start_time
-        self.is_all_day = is_all_day
+    name: str
+    start_time: datetime
+    end_time: Optional[datetime] = None
+    is_all_day: bool = False
+
+    def __post_init__(self):
+        if self.end_time is None:
+            self.end_time = self.start_time
 
     def format_time(self):
         if self.is_all_day:
@@ -16,17 +27,20 @@ class Event:
     def format_date(self):
         return self.start_time.strftime("%a %m/%d")
 
+@dataclass(slots=True, eq=False)
 class Task:
-    def __init__(self, name, due_date=None):
-        self.name = filter_emojis(name)
-        self.due_date = due_date
-        self.delta_days = 0
-        self.subtasks = []
-        self.subtask_overrun = 0
-        
-        if due_date:
-            now = datetime.now()
-            self.delta_days = (self.due_date.date() - now.date()).days
+    name: str
+    due_date: Optional[datetime] = None
+    # The run's date, captured once by whoever builds a batch of tasks;
+    # only standalone Tasks fall back to asking the clock.
+    today: InitVar[Optional[date]] = None
+    delta_days: int = field(default=0, init=False)
+    subtasks: list = field(default_factory=list, init=False)
+    subtask_overrun: int = field(default=0, init=False)
+
+    def __post_init__(self, today):
+        if self.due_date:
+            self.delta_days = (self.due_date.date() - (today or date.today())).days
     
     def due_today(self):
         return self.delta_days == 0
@@ -37,22 +51,64 @@ class Task:
     def later_than(self, num):
         return self.delta_days < (num * -1)
 
+@dataclass(slots=True, eq=False)
 class Subtask:
-    def __init__(self, name, complete=False):
-        self.name = name
-        self.complete = complete
+    name: str
+    complete: bool = False
 
+@dataclass(slots=True, eq=False)
 class Project:
-    def __init__(self, id, name):
-        self.id = id
-        self.name = name
-        self.tasks = []
+    id: str
+    name: str
+    tasks: List[Task] = field(default_factory=list, init=False)
+    # Set when TickTick couldn't be reached and the tasks come from the
+    # local task store; printed under the project name.
+    stale_note: Optional[str] = field(default=None, init=False)
+    # (late_within_days, today, late within, late beyond), from bucket_tasks().
+    _buckets: Optional[tuple] = field(default=None, init=False, repr=False)
+
+    def bucket_tasks(self, late_within_days=DEFAULT_LATE_WITHIN_DAYS):
+        """Sort `tasks` into due today / late within `late_within_days` /
+        later than that in one pass, so the queries below are lookups.
+        Call again after changing `tasks`."""
+        today, late_within, late_beyond = [], [], []
+        for task in self.tasks:
+            delta_days = task.delta_days
+            if delta_days == 0:
+                today.append(task)
+            elif delta_days < 0:
+                (late_within if delta_days >= -late_within_days else late_beyond).append(task)
+        self._buckets = (late_within_days, today, late_within, late_beyond)
+
+    def _bucketed(self, days):
+        if self._buckets is not None and self._buckets[0] == days:
+            return self._buckets
+        return None
 
     def tasks_today(self):
+        if self._buckets is not None:
+            return list(self._buckets[1])
         return list(filter(lambda t: t.due_today(), self.tasks))
     
     def tasks_due_within_days(self, days):
+        buckets = self._bucketed(days)
+        if buckets is not None:
+            return list(buckets[2])
         return list(filter(lambda t: t.late_within(days), self.tasks))
     
     def tasks_late(self, days):
+        buckets = self._bucketed(days)
+        if buckets is not None:
+            return list(buckets[3])
         return list(filter(lambda t: t.later_than(days), self.tasks))
+
+
+@dataclass
+class WeatherData:
+    day_temp_min: float
+    day_temp_max: float
+    day_weather_code: int
+    # Unix time the forecast was downloaded, and whether it's being served
+    # past its TTL because the live call failed.
+    fetched_at: Optional[float] = None
+    stale: bool = False
@@ -0,0 +1,178 @@
+"""Local SQLite copy of the TickTick tasks the receipt shows.
+
+TickTickAPI syncs every project it fetches into the store and the receipt
+is then built from indexed queries on it. A project whose download hashes
+the same as last time isn't parsed at all, and within a changed project
+only tasks whose `modifiedTime` (or content, where TickTick doesn't send
+one) changed are rewritten. When TickTick can't be reached, the last synced
+copy is served instead.
+
+Only dated tasks are stored, with all of their checklist items; the display
+options (max subtasks, completed items) are applied when reading.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import timedelta
+
+from reciept_util import cache_path
+
+TASK_STORE_FILE = "tasks.sqlite3"
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE projects (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    payload_hash TEXT,
+    synced_at REAL
+);
+CREATE TABLE tasks (
+    id TEXT PRIMARY KEY,
+    project_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    due_date TEXT NOT NULL,
+    due_day TEXT NOT NULL,
+    version TEXT NOT NULL,
+    items TEXT NOT NULL,
+    tags TEXT NOT NULL
+);
+CREATE INDEX tasks_by_due_day ON tasks (project_id, due_day, position);
+"""
+
+# The date part of a TickTick timestamp ("2019-11-13T03:00:00.000+0000"),
+# as Task.delta_days counts from it.
+DUE_DAY_LENGTH = len("YYYY-MM-DD")
+
+
+def _task_version(task_json):
+    modified = task_json.get('modifiedTime')
+    if modified:
+        return modified
+    return hashlib.sha256(json.dumps(task_json, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def _row_to_task_json(row):
+    title, due_date, items, tags = row
+    return {
+        'title': title,
+        'dueDate': due_date,
+        'items': [{'title': item_title, 'status': status} for item_title, status in json.loads(items)],
+        'tags': json.loads(tags),
+    }
+
+
+class TaskStore:
+    def __init__(self, path=None):
+        """Nothing touches the disk until the store is first used, so a run
+        that never syncs tasks never creates the database."""
+        self.path = path
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self):
+        # A connection per call: the store is used from the fetch threads.
+        with self._lock:
+            if self.path is None:
+                self.path = cache_path(TASK_STORE_FILE)
+            conn = sqlite3.connect(self.path, timeout=10)
+            if not self._ready:
+                self._create_schema(conn)
+                self._ready = True
+        conn.execute("PRAGMA journal_mode = WAL")
+        return conn
+
+    @staticmethod
+    def _create_schema(conn):
+        if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            # It's only a cache of TickTick; rebuild rather than migrate.
+            with conn:
+                conn.execute("DROP TABLE IF EXISTS tasks")
+                conn.execute("DROP TABLE IF EXISTS projects")
+                conn.executescript(SCHEMA)
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def payload_hash(self, project_id):
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT payload_hash FROM projects WHERE id = ?", (project_id,)).fetchone()
+        return row[0] if row else None
+
+    def synced_at(self, project_id):
+        """Unix time of the project's last successful sync, or None if it
+        was never synced."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT synced_at FROM projects WHERE id = ?", (project_id,)).fetchone()
+        return row[0] if row else None
+
+    def project_ids(self):
+        """Project name -> id for every synced project."""
+        with closing(self._connect()) as conn:
+            return dict(conn.execute("SELECT name, id FROM projects ORDER BY synced_at"))
+
+    def mark_synced(self, project_id, project_name, payload_hash):
+        """Record a sync that found the project unchanged."""
+        with closing(self._connect()) as conn, conn:
+            self._mark_synced(conn, project_id, project_name, payload_hash)
+
+    @staticmethod
+    def _mark_synced(conn, project_id, project_name, payload_hash):
+        conn.execute(
+            "INSERT INTO projects (id, name, payload_hash, synced_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET name = excluded.name, payload_hash = excluded.payload_hash, "
+            "synced_at = excluded.synced_at",
+            (project_id, project_name, payload_hash, time.time()),
+        )
+
+    def sync_project(self, project_id, project_name, payload_hash, tasks_json):
+        """Make the project's stored tasks match `tasks_json` (its dated
+        tasks, in order). Returns how many tasks were written."""
+        written = 0
+        seen = set()
+        with closing(self._connect()) as conn, conn:
+            for position, task_json in enumerate(tasks_json):
+                task_id = task_json.get('id') or f"{project_id}:{position}"
+                seen.add(task_id)
+                items = json.dumps([[item['title'], item.get('status', 0)] for item in task_json.get('items', [])])
+                cursor = conn.execute(
+                    "INSERT INTO tasks (id, project_id, position, title, due_date, due_day, version, items, tags) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (id) DO UPDATE SET project_id = excluded.project_id, position = excluded.position, "
+                    "title = excluded.title, due_date = excluded.due_date, due_day = excluded.due_day, "
+                    "version = excluded.version, items = excluded.items, tags = excluded.tags "
+                    "WHERE tasks.version != excluded.version OR tasks.position != excluded.position "
+                    "OR tasks.project_id != excluded.project_id",
+                    (task_id, project_id, position, task_json['title'], task_json['dueDate'],
+                     task_json['dueDate'][:DUE_DAY_LENGTH], _task_version(task_json), items,
+                     json.dumps(task_json.get('tags') or [])),
+                )
+                written += cursor.rowcount
+
+            stored = {row[0] for row in conn.execute("SELECT id FROM tasks WHERE project_id = ?", (project_id,))}
+            conn.executemany("DELETE FROM tasks WHERE id = ?", [(task_id,) for task_id in stored - seen])
+            self._mark_synced(conn, project_id, project_name, payload_hash)
+        return written
+
+    def _query(self, where, params):
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT title, due_date, items, tags FROM tasks WHERE project_id = ? AND {where} ORDER BY position",
+                params,
+            ).fetchall()
+        return [_row_to_task_json(row) for row in rows]
+
+    def tasks_due_today(self, project_id, today):
+        return self._query("due_day = ?", (project_id, today.isoformat()))
+
+    def tasks_late_within(self, project_id, today, days):
+        return self._query("due_day >= ? AND due_day < ?",
+                           (project_id, (today - timedelta(days=days)).isoformat(), today.isoformat()))
+
+    def tasks_late_beyond(self, project_id, today, days, earliest_day=""):
+        """Tasks more than `days` late, and due no earlier than
+        `earliest_day` (YYYY-MM-DD) if given."""
+        return self._query("due_day >= ? AND due_day < ?",
+                           (project_id, earliest_day, (today - timedelta(days=days)).isoformat()))
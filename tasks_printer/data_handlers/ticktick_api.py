@@ -1,59 +1,365 @@
 import requests
+import hashlib
 import json
-from datetime import datetime, timezone, timedelta
-from .models import Event, Task, Subtask, Project
+import tempfile
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from datetime import date, datetime, timezone, timedelta
+from functools import lru_cache
+from typing import Optional
+from reciept_util import is_true, start_daemon_job
+from . import transport
+from .models import DEFAULT_LATE_WITHIN_DAYS, Event, Task, Subtask, Project
+from .task_store import DUE_DAY_LENGTH
 
 API_GET_PROJECTS_URL = "https://api.ticktick.com/open/v1/project"
 API_GET_TASKS_URL = "https://api.ticktick.com/open/v1/project/{}/data"
 
+TICKTICK_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f%z"
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+@lru_cache(maxsize=4096)
+def parse_ticktick_datetime(value):
+    """Parse a TickTick timestamp such as "2019-11-13T03:00:00.000+0000".
+
+    fromisoformat is an order of magnitude faster than strptime but (before
+    Python 3.11) only takes "+HH:MM" offsets, so "+HHMM" and "Z" are
+    rewritten first; anything else falls back to strptime. Cached because
+    tasks in a project tend to share due dates (all-day tasks, recurring
+    series), and datetimes are immutable so sharing them is safe.
+    """
+    if value.endswith("Z"):
+        normalized = value[:-1] + "+00:00"
+    elif len(value) > 5 and value[-5] in "+-" and value[-3] != ":":
+        normalized = f"{value[:-2]}:{value[-2:]}"
+    else:
+        normalized = value
+    try:
+        return datetime.fromisoformat(normalized)
+    except ValueError:
+        return datetime.strptime(value, TICKTICK_DATETIME_FORMAT)
+
+
+def _parse_list(raw):
+    return tuple(item.strip() for item in raw.split(',') if item.strip())
+
+
+@dataclass(frozen=True)
+class TaskQuery:
+    """Which TickTick tasks the receipt wants, from [ModuleTickTick].
+
+    The receipt only ever shows tasks due today or overdue, so
+    get_tasks_from_projects skips everything else (due later, more than
+    `max_overdue_days` late, or not matching the tag filters) on the raw
+    JSON, before any Task is built.
+    """
+    projects: tuple = ('Out of House', 'House', 'Computer')
+    late_within_days: int = DEFAULT_LATE_WITHIN_DAYS
+    max_overdue_days: Optional[int] = None
+    max_subtasks: int = 5
+    show_completed_subtasks: bool = False
+    # A task is kept if it has any of `tags` (or `tags` is empty) and none of `exclude_tags`.
+    tags: frozenset = frozenset()
+    exclude_tags: frozenset = frozenset()
+
+    @classmethod
+    def from_config(cls, module_config):
+        defaults = cls()
+        max_overdue_days = module_config.get('max_overdue_days', '').strip()
+        return cls(
+            projects=_parse_list(module_config['projects']) if 'projects' in module_config else defaults.projects,
+            late_within_days=int(module_config.get('late_within_days', defaults.late_within_days)),
+            max_overdue_days=int(max_overdue_days) if max_overdue_days else None,
+            max_subtasks=int(module_config.get('max_subtasks', defaults.max_subtasks)),
+            show_completed_subtasks=is_true(module_config.get('show_completed_subtasks', 'false')),
+            tags=frozenset(tag.lower() for tag in _parse_list(module_config.get('tags', ''))),
+            exclude_tags=frozenset(tag.lower() for tag in _parse_list(module_config.get('exclude_tags', ''))),
+        )
+
+    def earliest_day(self, today):
+        """The oldest due date (as YYYY-MM-DD) still wanted, or "" for no limit."""
+        if self.max_overdue_days is None:
+            return ""
+        return (today - timedelta(days=self.max_overdue_days)).isoformat()
+
+    def matches_tags(self, tags):
+        if not self.tags and not self.exclude_tags:
+            return True
+        tags = {tag.lower() for tag in tags or ()}
+        return (not self.tags or not self.tags.isdisjoint(tags)) and self.exclude_tags.isdisjoint(tags)
+
+    def filter(self, tasks_json, today):
+        """The dated `tasks_json` the receipt can show on `today`. Compares
+        the date part of dueDate as a string (as Task.delta_days counts
+        from it), so skipped tasks never have their timestamps parsed."""
+        latest = today.isoformat()
+        earliest = self.earliest_day(today)
+        for task_json in tasks_json:
+            due_day = task_json['dueDate'][:DUE_DAY_LENGTH]
+            if earliest <= due_day <= latest and self.matches_tags(task_json.get('tags')):
+                yield task_json
+
+
+DEFAULT_QUERY = TaskQuery()
+
+
+def _iter_tasks_json(stream):
+    """The `tasks` array of a /project/{id}/data body, read from the binary
+    file-like `stream`, one task at a time."""
+    try:
+        import ijson
+    except ImportError:
+        yield from json.load(stream).get('tasks', [])
+        return
+
+    try:
+        yield from ijson.items(stream, 'tasks.item')
+    except ijson.JSONError as e:
+        raise ValueError(f"Malformed project data: {e}") from e
+
+
+def _dated_tasks(tasks_json, include_completed_subtasks):
+    for task_json in tasks_json:
+        if 'dueDate' not in task_json:
+            continue
+        if not include_completed_subtasks and 'items' in task_json:
+            # A copy, since the task may be from a payload the events share.
+            task_json = {**task_json, 'items': [item for item in task_json['items'] if not item.get('status')]}
+        yield task_json
+
+
+def _task_from_json(task_json, today, max_subtasks, show_completed_subtasks):
+    task = Task(task_json['title'], parse_ticktick_datetime(task_json['dueDate']), today=today)
+
+    # Handle subtasks
+    if 'items' in task_json:
+        for subtask_json in task_json['items']:
+            subtask = Subtask(
+                subtask_json['title'],
+                subtask_json['status']
+            )
+            if subtask.complete:
+                if show_completed_subtasks:
+                    task.subtasks.append(subtask)
+            else:
+                task.subtasks.insert(0, subtask)
+
+        if len(task.subtasks) > max_subtasks:
+            task.subtask_overrun = len(task.subtasks) - max_subtasks
+            task.subtasks = task.subtasks[:max_subtasks]
+
+    return task
+
+
 class TickTickAPI:
-    def __init__(self, bearer_token):
+    def __init__(self, bearer_token, http_settings=None, store=None, query=None, shared_projects=()):
+        """With a `store` (a task_store.TaskStore), get_tasks_from_projects
+        syncs each project into it and reads the tasks back from it, falling
+        back to the last synced copy when TickTick can't be reached. `query`
+        (a TaskQuery) picks which tasks it builds.
+
+        `shared_projects` names projects that are also read as events. Their
+        tasks come from the same cached get_project_tasks download as the
+        events, instead of a streamed download of their own."""
         self.bearer_token = bearer_token
+        self.http_settings = http_settings
+        self.store = store
+        self.query = query or DEFAULT_QUERY
+        self.shared_projects = frozenset(shared_projects)
         self.api_headers = {
             'Authorization': f"Bearer {bearer_token}",
             'cache-control': "no-cache",
             'Content-Type': 'application/json/'
         }
-    
-    def get_projects(self):
-        """Fetch all projects from TickTick API"""
+        # Per-run caches: a client lives for one build_context, so nothing
+        # here needs invalidating. The lock lets the tasks and events jobs
+        # share one client from different threads.
+        self._lock = threading.Lock()
+        self._responses = {}
+        self._project_ids = None
+
+    def _request_json(self, url, description):
         try:
-            response = requests.get(API_GET_PROJECTS_URL, headers=self.api_headers)
+            response = transport.get(url, self.http_settings, headers=self.api_headers)
             
             if response.status_code == 200:
                 return response.json()
             else:
-                print(f"Failed to fetch projects: {response.status_code} - {response.text}")
+                print(f"Failed to fetch {description}: {response.status_code} - {response.text}")
                 return None
         except requests.exceptions.RequestException as e:
-            print(f"Network error fetching projects: {e}")
+            print(f"Network error fetching {description}: {e}")
             return None
+
+    def _get_json(self, url, description):
+        """GET `url` at most once per client. Concurrent callers asking for
+        the same URL wait on the first caller's request instead of issuing
+        their own."""
+        with self._lock:
+            future = self._responses.get(url)
+            owner = future is None
+            if owner:
+                future = self._responses[url] = Future()
+
+        if owner:
+            try:
+                future.set_result(self._request_json(url, description))
+            except BaseException as e:
+                future.set_exception(e)
+        return future.result()
+
+    def get_projects(self):
+        """Fetch all projects from TickTick API"""
+        return self._get_json(API_GET_PROJECTS_URL, "projects")
     
     def get_project_tasks(self, project_id):
         """Fetch tasks for a specific project"""
-        try:
-            response = requests.get(API_GET_TASKS_URL.format(project_id), headers=self.api_headers)
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
+        return self._get_json(API_GET_TASKS_URL.format(project_id), f"tasks for project {project_id}")
+    
+    def iter_dated_tasks(self, project_id, include_completed_subtasks=False):
+        """Yield the project's tasks that have a dueDate, decoded one at a
+        time from the response stream, with completed checklist items already
+        dropped unless `include_completed_subtasks`.
+
+        With ijson installed only one task is held in memory at a time, no
+        matter how large the project; without it the body is decoded whole
+        and filtered the same way. Not shared through the per-client
+        response cache, since the filtered tasks are no use to other callers
+        (see `shared_projects` for projects the events read too).
+        Raises RequestException or ValueError if the stream breaks off.
+        """
+        url = API_GET_TASKS_URL.format(project_id)
+        with transport.get(url, self.http_settings, headers=self.api_headers, stream=True) as response:
+            if response.status_code != 200:
                 print(f"Failed to fetch tasks for project {project_id}: {response.status_code} - {response.text}")
-                return None
-        except requests.exceptions.RequestException as e:
+                return
+
+            # The raw stream skips requests' own decompression.
+            response.raw.decode_content = True
+            yield from _dated_tasks(_iter_tasks_json(response.raw), include_completed_subtasks)
+
+    def sync_project(self, project_id, project_name):
+        """Download the project into the store. The body is spooled to a
+        temp file while it's hashed, and only decoded if the hash differs
+        from the last sync. Returns False if TickTick answered with an error;
+        raises RequestException or ValueError if it couldn't be read."""
+        url = API_GET_TASKS_URL.format(project_id)
+        with transport.get(url, self.http_settings, headers=self.api_headers, stream=True) as response:
+            if response.status_code != 200:
+                print(f"Failed to fetch tasks for project {project_id}: {response.status_code} - {response.text}")
+                return False
+
+            with tempfile.TemporaryFile() as body:
+                digest = hashlib.sha256()
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    digest.update(chunk)
+                    body.write(chunk)
+                payload_hash = digest.hexdigest()
+
+                if payload_hash == self.store.payload_hash(project_id):
+                    self.store.mark_synced(project_id, project_name, payload_hash)
+                    return True
+                body.seek(0)
+                written = self.store.sync_project(
+                    project_id, project_name, payload_hash,
+                    _dated_tasks(_iter_tasks_json(body), include_completed_subtasks=True),
+                )
+        print(f"Synced TickTick project '{project_name}': {written} task(s) changed")
+        return True
+
+    def _sync_shared_project(self, project_id, project_name):
+        """sync_project for a project in `shared_projects`, from the
+        already decoded payload; hashed from its canonical JSON instead of
+        the body bytes."""
+        payload = self.get_project_tasks(project_id)
+        if payload is None:
+            return False
+        payload_hash = hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+        if payload_hash == self.store.payload_hash(project_id):
+            self.store.mark_synced(project_id, project_name, payload_hash)
+            return True
+        written = self.store.sync_project(
+            project_id, project_name, payload_hash,
+            _dated_tasks(payload.get('tasks', []), include_completed_subtasks=True),
+        )
+        print(f"Synced TickTick project '{project_name}': {written} task(s) changed")
+        return True
+
+    def _synced_project(self, project_id, project_name, today, max_subtasks, show_completed_subtasks):
+        sync = self._sync_shared_project if project_name in self.shared_projects else self.sync_project
+        try:
+            synced = sync(project_id, project_name)
+        except (requests.exceptions.RequestException, ValueError) as e:
             print(f"Network error fetching tasks for project {project_id}: {e}")
-            return None
-    
+            synced = False
+        if synced:
+            return self._project_from_store(project_id, project_name, today, max_subtasks, show_completed_subtasks)
+
+        synced_at = self.store.synced_at(project_id)
+        if synced_at is None:
+            return Project(project_id, project_name)
+        # Marked on the receipt, like an offline calendar or forecast.
+        project = self._project_from_store(project_id, project_name, today, max_subtasks, show_completed_subtasks)
+        project.stale_note = f"offline, synced {datetime.fromtimestamp(synced_at).strftime('%a %m/%d %I:%M %p')}"
+        print(f"Using tasks for '{project_name}' from the last sync ({project.stale_note})")
+        return project
+
+    def _project_from_store(self, project_id, project_name, today, max_subtasks, show_completed_subtasks):
+        """The project's tasks that are due today or overdue, from the
+        store's indexed queries. Tasks due later never show on the receipt."""
+        project = Project(project_id, project_name)
+        days = self.query.late_within_days
+        stored = (
+            self.store.tasks_due_today(project_id, today)
+            + self.store.tasks_late_within(project_id, today, days)
+            + self.store.tasks_late_beyond(project_id, today, days, earliest_day=self.query.earliest_day(today))
+        )
+        for task_json in self.query.filter(stored, today):
+            try:
+                project.tasks.append(_task_from_json(task_json, today, max_subtasks, show_completed_subtasks))
+            except Exception as e:
+                print(f"Error parsing TickTick task: {e}")
+        return project
+
+    def _fetched_project(self, project_id, project_name, today, max_subtasks, show_completed_subtasks):
+        project = Project(project_id, project_name)
+        if project_name in self.shared_projects:
+            payload = self.get_project_tasks(project_id) or {}
+            dated = _dated_tasks(payload.get('tasks', []), show_completed_subtasks)
+        else:
+            dated = self.iter_dated_tasks(project_id, show_completed_subtasks)
+        try:
+            for task_json in self.query.filter(dated, today):
+                try:
+                    project.tasks.append(_task_from_json(task_json, today, max_subtasks, show_completed_subtasks))
+                except Exception as e:
+                    print(f"Error parsing TickTick task: {e}")
+        except (requests.exceptions.RequestException, ValueError) as e:
+            # A stream that broke off part-way leaves the project empty,
+            # as a failed download always has.
+            print(f"Network error fetching tasks for project {project_id}: {e}")
+            project.tasks = []
+        return project
+
+    def _project_index(self):
+        """Project name -> id, built from a single project-list download."""
+        if self._project_ids is None:
+            projects = self.get_projects()
+            if projects is None and self.store is not None:
+                print("Using TickTick project list from the local task store")
+                self._project_ids = self.store.project_ids()
+                return self._project_ids
+            index = {}
+            for project in projects or []:
+                index.setdefault(project.get('name'), project.get('id'))
+            self._project_ids = index
+        return self._project_ids
+
     def find_project_by_name(self, project_name):
         """Find a project by name and return its ID"""
-        projects = self.get_projects()
-        if not projects:
-            return None
-        
-        for project in projects:
-            if project.get('name') == project_name:
-                return project.get('id')
-        
-        return None
+        return self._project_index().get(project_name)
     
     def get_events_from_project(self, project_name, days_ahead=7):
         """Get events from a TickTick project as Event objects"""
@@ -76,18 +382,17 @@ class TickTickAPI:
                 name = task_json['title']
                 is_all_day = task_json.get('isAllDay', False)
 
+                due_date = parse_ticktick_datetime(task_json['dueDate']) if 'dueDate' in task_json else None
+
                 if 'startDate' in task_json:
-                    start_time = datetime.strptime(task_json['startDate'], "%Y-%m-%dT%H:%M:%S.%f%z")
-                elif 'dueDate' in task_json:
-                    start_time = datetime.strptime(task_json['dueDate'], "%Y-%m-%dT%H:%M:%S.%f%z")
+                    start_time = parse_ticktick_datetime(task_json['startDate'])
+                elif due_date is not None:
+                    start_time = due_date
                 else:
                     # If no start/due date, assume it's for today
                     start_time = datetime.now(timezone.utc)
 
-                if 'dueDate' in task_json:
-                    end_time = datetime.strptime(task_json['dueDate'], "%Y-%m-%dT%H:%M:%S.%f%z")
-                else:
-                    end_time = start_time
+                end_time = due_date if due_date is not None else start_time
 
                 # Only include events within the time range
                 if now <= start_time <= time_max:
@@ -99,50 +404,24 @@ class TickTickAPI:
         return events
     
     def get_tasks_from_projects(self, project_names, max_subtasks=5, show_completed_subtasks=False):
-        """Get tasks from multiple TickTick projects as Task objects"""
-        projects = []
+        """Get tasks from multiple TickTick projects as Task objects. Only
+        tasks `self.query` wants are built, and the projects are fetched in
+        parallel."""
+        # One date for every task in this fetch, not a clock read per task.
+        today = date.today()
+        found = []
         
         for project_name in project_names:
             project_id = self.find_project_by_name(project_name)
             if not project_id:
                 print(f"TickTick project '{project_name}' not found")
                 continue
-            
-            project = Project(project_id, project_name)
-            project_data = self.get_project_tasks(project_id)
-            
-            if project_data:
-                tasks_json = project_data.get('tasks', [])
-                for task_json in tasks_json:
-                    if 'dueDate' not in task_json:
-                        continue
-                    
-                    try:
-                        name = task_json['title']
-                        due_date = datetime.strptime(task_json['dueDate'], "%Y-%m-%dT%H:%M:%S.%f%z")
-                        task = Task(name, due_date)
-                        
-                        # Handle subtasks
-                        if 'items' in task_json:
-                            for subtask_json in task_json['items']:
-                                subtask = Subtask(
-                                    subtask_json['title'],
-                                    subtask_json['status']
-                                )
-                                if subtask.complete:
-                                    if show_completed_subtasks:
-                                        task.subtasks.append(subtask)
-                                else:
-                                    task.subtasks.insert(0, subtask)
-                            
-                            if len(task.subtasks) > max_subtasks:
-                                task.subtask_overrun = len(task.subtasks) - max_subtasks
-                                task.subtasks = task.subtasks[:max_subtasks]
-                        
-                        project.tasks.append(task)
-                    except Exception as e:
-                        print(f"Error parsing TickTick task: {e}")
-            
-            projects.append(project)
-        
-        return projects
+            found.append((project_id, project_name))
+
+        fetch = self._synced_project if self.store is not None else self._fetched_project
+        futures = [
+            start_daemon_job(lambda project_id=project_id, project_name=project_name: fetch(
+                project_id, project_name, today, max_subtasks, show_completed_subtasks))
+            for project_id, project_name in found
+        ]
+        return [future.result() for future in futures]
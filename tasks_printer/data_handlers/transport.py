@@ -0,0 +1,94 @@
+"""Shared HTTP transport for the data handlers.
+
+Every handler goes through `get()` so requests to the same host reuse one
+pooled keep-alive `requests.Session` (one TLS handshake per host per process
+instead of per call), always carry a connect/read timeout, and retry 5xx
+responses and connection errors with exponential backoff.
+"""
+import threading
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRY_STATUSES = (500, 502, 503, 504)
+POOL_SIZE = 4
+
+
+@dataclass(frozen=True)
+class HttpSettings:
+    connect_timeout: float = 5.0
+    read_timeout: float = 20.0
+    retries: int = 3
+    retry_backoff: float = 0.5
+
+    @classmethod
+    def from_config(cls, module_config):
+        """Read the optional connect_timeout/read_timeout/retries/retry_backoff
+        keys from a module's config section."""
+        defaults = cls()
+        return cls(
+            connect_timeout=float(module_config.get('connect_timeout', defaults.connect_timeout)),
+            read_timeout=float(module_config.get('read_timeout', defaults.read_timeout)),
+            retries=int(module_config.get('retries', defaults.retries)),
+            retry_backoff=float(module_config.get('retry_backoff', defaults.retry_backoff)),
+        )
+
+    @property
+    def timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+
+DEFAULT_SETTINGS = HttpSettings()
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def _new_session(settings):
+    retry = Retry(
+        total=settings.retries,
+        connect=settings.retries,
+        read=settings.retries,
+        status=settings.retries,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({'GET'}),
+        backoff_factor=settings.retry_backoff,
+        # Hand the final 5xx back to the caller so its own error handling
+        # (raise_for_status, status_code checks) still reports it.
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=1, pool_maxsize=POOL_SIZE)
+
+    session = requests.Session()
+    session.headers['Accept-Encoding'] = 'gzip, deflate'
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session(url, settings=DEFAULT_SETTINGS):
+    """The pooled session for `url`'s host. Sessions are also keyed on the
+    retry policy, since that lives on the session's adapter."""
+    parts = urlsplit(url)
+    key = (parts.scheme, parts.netloc, settings.retries, settings.retry_backoff)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _sessions[key] = _new_session(settings)
+        return session
+
+
+def get(url, settings=None, **kwargs):
+    settings = settings or DEFAULT_SETTINGS
+    kwargs.setdefault('timeout', settings.timeout)
+    return get_session(url, settings).get(url, **kwargs)
+
+
+def close_sessions():
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -1,17 +1,20 @@
-import requests
-from dataclasses import dataclass
+import json
+import time
+from dataclasses import asdict
+from datetime import datetime
+from zoneinfo import ZoneInfo
 
-API_GET_WEATHER = "https://api.open-meteo.com/v1/forecast"
+from reciept_util import atomic_write, cache_path
+from . import transport
+from .models import WeatherData
 
+API_GET_WEATHER = "https://api.open-meteo.com/v1/forecast"
 
-@dataclass
-class WeatherData:
-    day_temp_min: float
-    day_temp_max: float
-    day_weather_code: int
+WEATHER_CACHE_FILE = "weather.json"
+DEFAULT_CACHE_TTL_MINUTES = 60
 
 
-def fetch_weather(latitude, longitude, timezone='America/Los_Angeles'):
+def _fetch_live(latitude, longitude, timezone, http_settings):
     params = {
         "latitude": latitude,
         "longitude": longitude,
@@ -21,7 +24,7 @@ def fetch_weather(latitude, longitude, timezone='America/Los_Angeles'):
         "temperature_unit": "fahrenheit"
     }
 
-    response = requests.get(API_GET_WEATHER, params=params)
+    response = transport.get(API_GET_WEATHER, http_settings, params=params)
     response.raise_for_status()
 
     day_json = response.json()['daily']
@@ -29,4 +32,48 @@ def fetch_weather(latitude, longitude, timezone='America/Los_Angeles'):
         day_temp_min=day_json['temperature_2m_min'][0],
         day_temp_max=day_json['temperature_2m_max'][0],
         day_weather_code=day_json['weather_code'][0],
+        fetched_at=time.time(),
     )
+
+
+def _load_cache(path):
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _from_entry(entry, stale=False):
+    return WeatherData(**{**entry, 'stale': stale})
+
+
+def fetch_weather(latitude, longitude, timezone='America/Los_Angeles', http_settings=None,
+                  cache_ttl_minutes=DEFAULT_CACHE_TTL_MINUTES):
+    """Today's forecast, cached on disk per (lat, lon, timezone, date).
+
+    A cached forecast younger than `cache_ttl_minutes` is returned without
+    touching the network. An older one is only used if the live call fails,
+    in which case it comes back with `stale=True`.
+    """
+    today = datetime.now(ZoneInfo(timezone)).date().isoformat()
+    key = f"{latitude},{longitude},{timezone},{today}"
+    path = cache_path(WEATHER_CACHE_FILE)
+    cache = _load_cache(path)
+    entry = cache.get(key)
+
+    if entry and time.time() - entry['fetched_at'] < cache_ttl_minutes * 60:
+        return _from_entry(entry)
+
+    try:
+        weather = _fetch_live(latitude, longitude, timezone, http_settings)
+    except Exception as e:
+        if not entry:
+            raise
+        print(f"Weather fetch failed, using cached forecast: {e}")
+        return _from_entry(entry, stale=True)
+
+    # Only today's entries are worth keeping; older dates can never be served.
+    cache = {k: v for k, v in cache.items() if k.endswith(today)}
+    cache[key] = {k: v for k, v in asdict(weather).items() if k != 'stale'}
+    atomic_write(path, json.dumps(cache))
+    return weather
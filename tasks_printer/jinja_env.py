@@ -1,12 +1,3 @@
-from pathlib import Path
+from templating import get_env
 
-from jinja2 import Environment, FileSystemLoader
-
-TEMPLATES_DIR = Path(__file__).parent / "templates"
-
-env = Environment(
-    loader=FileSystemLoader(str(TEMPLATES_DIR)),
-    trim_blocks=True,
-    lstrip_blocks=True,
-    keep_trailing_newline=True,
-)
+env = get_env("tasks_printer")
@@ -1,5 +1,3 @@
-from datetime import datetime
-
 from ..jinja_env import env
 
 
@@ -14,8 +12,11 @@ class ModuleHeader:
     def __init__(self, config):
         pass
 
+    def cache_key(self, context):
+        return context.current_time().date()
+
     def render(self, p, context):
-        today = datetime.today()
+        today = context.current_time()
         rendered = env.get_template("header.jinja").render(
             month=today.strftime('%B'),
             day_with_suffix=get_day_with_suffix(today.day),
@@ -1,9 +1,16 @@
+import heapq
 import math
 
 from RecieptPrinter import CHAR_WIDTH
+from reciept_util import is_true
 
 DEFAULT_START_HOUR = 6
 DEFAULT_END_HOUR = 23
+DEFAULT_RESOLUTION_MINUTES = 60
+RESOLUTIONS_MINUTES = (15, 30, 60)
+
+# Printed in place of a run of empty rows when compress_empty is on.
+COMPRESSED_ROW = "..."
 
 HOUR_LABEL_WIDTH = 2
 COLUMN_SPACER = " "
@@ -17,22 +24,45 @@ def _hour_position(dt):
     return dt.hour + dt.minute / 60
 
 
+def _compress_empty_rows(rows, is_empty):
+    """Replace each run of two or more empty rows with a single None, which
+    is printed as COMPRESSED_ROW."""
+    compressed = []
+    run = []
+    for row, empty in zip(rows, is_empty):
+        if empty:
+            run.append(row)
+            continue
+        compressed.extend(run if len(run) < 2 else [None])
+        run = []
+        compressed.append(row)
+    compressed.extend(run if len(run) < 2 else [None])
+    return compressed
+
+
 def _assign_columns(events):
-    """Greedy interval-graph coloring: overlapping events get different columns."""
-    columns_last_end = []
+    """Greedy interval-graph coloring: overlapping events get different columns.
+
+    Each event takes the lowest-numbered column that's free by its start.
+    Busy columns sit in a min-heap by end time, so freeing the ones that have
+    ended is O(log columns) each instead of a scan over every column.
+    """
+    busy = []  # (end_time, order, column)
+    free = []  # column indexes, lowest first
+    num_columns = 0
     assignments = {}
-    for event in sorted(events, key=lambda e: e.start_time):
-        placed = False
-        for i, last_end in enumerate(columns_last_end):
-            if event.start_time >= last_end:
-                columns_last_end[i] = event.end_time
-                assignments[event] = i
-                placed = True
-                break
-        if not placed:
-            columns_last_end.append(event.end_time)
-            assignments[event] = len(columns_last_end) - 1
-    return assignments, max(len(columns_last_end), 1)
+    for i, event in enumerate(sorted(events, key=lambda e: e.start_time)):
+        while busy and busy[0][0] <= event.start_time:
+            heapq.heappush(free, heapq.heappop(busy)[2])
+        if free:
+            column = heapq.heappop(free)
+        else:
+            column = num_columns
+            num_columns += 1
+        # `i` breaks end-time ties so events themselves are never compared.
+        heapq.heappush(busy, (event.end_time, i, column))
+        assignments[event] = column
+    return assignments, max(num_columns, 1)
 
 
 def _render_cell(width, event, is_top, is_bottom):
@@ -55,6 +85,16 @@ class ModuleSchedule:
     def __init__(self, config):
         self.start_hour = int(config.get('start_hour', DEFAULT_START_HOUR))
         self.end_hour = int(config.get('end_hour', DEFAULT_END_HOUR))
+        self.resolution = int(config.get('resolution_minutes', DEFAULT_RESOLUTION_MINUTES))
+        if self.resolution not in RESOLUTIONS_MINUTES:
+            raise ValueError(f"ModuleSchedule resolution_minutes must be one of {RESOLUTIONS_MINUTES}")
+        self.compress_empty = is_true(config.get('compress_empty', 'false'))
+
+    def cache_key(self, context):
+        return [
+            context.events_errors,
+            [[e.name, e.start_time, e.end_time, e.is_all_day] for e in context.events],
+        ]
 
     def render(self, p, context):
         p.set(bold=True)
@@ -81,26 +121,60 @@ class ModuleSchedule:
         grid_width -= len(COLUMN_SPACER) * (num_columns - 1)
         col_width = max(1, grid_width // num_columns)
 
-        # First/last displayed row for each event, clipped to the graph's hour range.
-        spans = {}
+        # Occupancy matrix, one row per `resolution`-minute slot and one
+        # entry per column, filled in a single pass over each event's rows.
+        # Cell strings are built once per event, not once per row.
+        slots_per_hour = 60 // self.resolution
+        first_row = self.start_hour * slots_per_hour
+        end_row = (self.end_hour + 1) * slots_per_hour
+        blank = " " * col_width
+        rows = [[blank] * num_columns for _ in range(end_row - first_row)]
+        is_empty = [True] * len(rows)
+
         for event in timed:
-            first_hour = max(event.start_time.hour, self.start_hour)
-            last_hour = max(math.ceil(_hour_position(event.end_time)) - 1, first_hour)
-            last_hour = min(last_hour, self.end_hour)
-            spans[event] = (first_hour, last_hour)
-
-        for hour in range(self.start_hour, self.end_hour + 1):
-            slot_start = hour
-            slot_end = hour + 1
-
-            cells = [" " * col_width] * num_columns
-            for event in timed:
-                if not (_hour_position(event.start_time) < slot_end and _hour_position(event.end_time) > slot_start):
-                    continue
-                first_hour, last_hour = spans[event]
-                is_top = hour == first_hour
-                is_bottom = hour == last_hour and not is_top
-                cells[columns[event]] = _render_cell(col_width, event, is_top, is_bottom)
-
-            label = format_hour_label(hour)
-            p.text(f"{label}{COLUMN_SPACER}{COLUMN_SPACER.join(cells)}")
+            start_position = _hour_position(event.start_time) * slots_per_hour
+            end_position = _hour_position(event.end_time) * slots_per_hour
+            # Slots [row, row + 1) the event overlaps.
+            overlap_start = max(math.floor(start_position), first_row)
+            overlap_end = min(math.ceil(end_position), end_row)
+            if overlap_start >= overlap_end:
+                continue
+
+            # First/last displayed row for the event, clipped to the graph's range.
+            top_row = max(math.floor(start_position), first_row)
+            bottom_row = max(math.ceil(end_position) - 1, top_row)
+            bottom_row = min(bottom_row, end_row - 1)
+
+            column = columns[event]
+            top = _render_cell(col_width, event, True, False)
+            middle = _render_cell(col_width, event, False, False)
+            bottom = _render_cell(col_width, event, False, True)
+            for row in range(overlap_start, overlap_end):
+                if row == top_row:
+                    cell = top
+                elif row == bottom_row:
+                    cell = bottom
+                else:
+                    cell = middle
+                rows[row - first_row][column] = cell
+                is_empty[row - first_row] = False
+
+        printed = range(len(rows))
+        if self.compress_empty:
+            printed = _compress_empty_rows(printed, is_empty)
+
+        after_gap = False
+        for index in printed:
+            if index is None:
+                p.text(COMPRESSED_ROW)
+                after_gap = True
+                continue
+            row = first_row + index
+            # Only the first slot of each hour is labeled, and the first row
+            # after a "...", which may have folded that slot away.
+            if row % slots_per_hour == 0 or after_gap:
+                label = format_hour_label(row // slots_per_hour)
+            else:
+                label = " " * HOUR_LABEL_WIDTH
+            p.text(f"{label}{COLUMN_SPACER}{COLUMN_SPACER.join(rows[index])}")
+            after_gap = False
@@ -6,5 +6,8 @@ class ModuleSeparator:
         self.pattern = config['pattern'] if 'pattern' in config else DEFAULT_SEPARATOR
         self.size = int(42/len(self.pattern))
 
+    def cache_key(self, context):
+        return None
+
     def render(self, p, context):
         p.text(self.pattern * self.size)
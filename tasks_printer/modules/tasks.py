@@ -1,9 +1,8 @@
 import random
 
+from ..data_handlers.models import DEFAULT_LATE_WITHIN_DAYS
 from ..jinja_env import env
 
-TASK_DISP_LATE_WITHIN_DAYS = 3
-
 UNFILED_TASKS_COUNT = 3
 
 RESCHEDULE_TASKS_COUNT = 5
@@ -11,20 +10,35 @@ RESCHEDULE_TASKS_COUNT = 5
 
 class ModuleTickTick:
     def __init__(self, config):
-        pass
+        # Shared with the TaskQuery that fetched the tasks, so they're
+        # bucketed the same way they're shown.
+        self.late_within_days = int(config.get('late_within_days', DEFAULT_LATE_WITHIN_DAYS))
+
+    def cache_key(self, context):
+        return [
+            context.ticktick_error,
+            [
+                [project.id, project.name, project.stale_note, [
+                    [task.name, task.due_date, task.delta_days, task.subtask_overrun,
+                     [[subtask.name, subtask.complete] for subtask in task.subtasks]]
+                    for task in project.tasks
+                ]]
+                for project in context.projects
+            ],
+        ]
 
     def render(self, p, context):
         p.set(bold=True)
         p.text("Today's Tasks")
         p.set(bold=False)
 
-        reschedule_tasks = [task for project in context.projects for task in project.tasks_late(3)]
+        reschedule_tasks = [task for project in context.projects for task in project.tasks_late(self.late_within_days)]
         reschedule_sample = random.sample(reschedule_tasks, min(RESCHEDULE_TASKS_COUNT, len(reschedule_tasks)))
 
         rendered = env.get_template("tasks.jinja").render(
             error=context.ticktick_error,
             projects=context.projects,
-            late_within_days=TASK_DISP_LATE_WITHIN_DAYS,
+            late_within_days=self.late_within_days,
             unfiled_tasks_count=UNFILED_TASKS_COUNT,
             reschedule_sample=reschedule_sample,
         )
@@ -32,10 +32,25 @@ WMO_CODE = {
 }
 
 
+def format_age(seconds):
+    minutes = int(seconds // 60)
+    if minutes < 60:
+        return f"{minutes}m"
+    return f"{minutes // 60}h{minutes % 60:02d}m"
+
+
 class ModuleWeather:
     def __init__(self, config):
         pass
 
+    def cache_key(self, context):
+        weather = context.weather
+        return [
+            context.weather_error,
+            [weather.day_temp_min, weather.day_temp_max, weather.day_weather_code] if weather else None,
+            format_age(context.current_time().timestamp() - weather.fetched_at) if weather and weather.stale else None,
+        ]
+
     def render(self, p, context):
         weather = context.weather
         description = None
@@ -47,5 +62,6 @@ class ModuleWeather:
             temp_max=weather.day_temp_max if weather else None,
             temp_min=weather.day_temp_min if weather else None,
             description=description,
+            stale_age=format_age(context.current_time().timestamp() - weather.fetched_at) if weather and weather.stale else None,
         ).rstrip("\n")
         p.text(rendered)
@@ -0,0 +1,90 @@
+"""Fetch a DailyContext ahead of the print and keep it ready on disk.
+
+`prefetch()` runs the full build_context some minutes before the scheduled
+print (from the daemon, or `main.py --prefetch` in cron) and saves it as a
+snapshot. `context_for_print()` then starts from that snapshot, so printing
+is render + send only, and only refetches live the sources whose prefetch
+failed.
+"""
+import os
+import time
+from datetime import date, datetime
+
+from reciept_util import cache_path
+from .context import SCHEDULE_NOT_CONFIGURED, build_context
+from .snapshot import load_snapshot, save_snapshot
+
+PREFETCH_FILE = "prefetch.json"
+DEFAULT_LEAD_MINUTES = 15
+DEFAULT_MAX_AGE_MINUTES = 90
+
+
+def _prefetch_config(config):
+    return config['Prefetch'] if 'Prefetch' in config else {}
+
+
+def prefetch(config, path=None):
+    context = build_context(config)
+    save_snapshot(context, path or cache_path(PREFETCH_FILE))
+    return context
+
+
+def failed_sources(context):
+    """The build_context sources that came back with an error, or only from
+    an offline copy (a stale forecast, tasks from the task store, a calendar
+    whose note is in events_errors)."""
+    failed = []
+    if context.ticktick_error or any(project.stale_note for project in context.projects):
+        failed.append('ticktick')
+    if context.weather_error or (context.weather and context.weather.stale):
+        failed.append('weather')
+    # Not configured isn't a failed fetch; refetching won't change it.
+    if any(error != SCHEDULE_NOT_CONFIGURED for error in context.events_errors):
+        failed.append('schedule')
+    return failed
+
+
+def load_prefetched(config, path=None):
+    """The prefetched context, or None if there isn't one from today that's
+    younger than `max_age_minutes`."""
+    path = path or cache_path(PREFETCH_FILE)
+    max_age_minutes = float(_prefetch_config(config).get('max_age_minutes', DEFAULT_MAX_AGE_MINUTES))
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    if datetime.fromtimestamp(mtime).date() != date.today() or time.time() - mtime > max_age_minutes * 60:
+        return None
+
+    try:
+        return load_snapshot(path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Ignoring unreadable prefetch snapshot: {e}")
+        return None
+
+
+def context_for_print(config, path=None):
+    """The context to print from: the fresh prefetch if there is one, with
+    any failed sources fetched again live; otherwise a full live fetch."""
+    context = load_prefetched(config, path)
+    if context is None:
+        return build_context(config)
+
+    # Printed as of now, not as of the prefetch.
+    context.now = None
+    failed = failed_sources(context)
+    if not failed:
+        return context
+
+    print(f"Refetching sources whose prefetch failed: {', '.join(failed)}")
+    live = build_context(config, sources=failed)
+    if 'ticktick' in failed:
+        context.projects = live.projects
+        context.ticktick_error = live.ticktick_error
+    if 'weather' in failed:
+        context.weather = live.weather
+        context.weather_error = live.weather_error
+    if 'schedule' in failed:
+        context.events = live.events
+        context.events_errors = live.events_errors
+    return context
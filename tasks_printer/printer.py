@@ -1,3 +1,4 @@
+from render_cache import code_fingerprint, content_hash, print_receipt, render_module
 from .modules.header import ModuleHeader
 from .modules.tasks import ModuleTickTick
 from .modules.weather import ModuleWeather
@@ -8,7 +9,19 @@ module_classes = [ModuleHeader, ModuleWeather, ModuleSchedule, ModuleSeparator,
 
 
 def render_receipt(p, context, config):
+    """Print the daily receipt. Each module's output is cached by the hash of
+    its config and the slice of `context` it reads (its `cache_key`), and the
+    finished receipt by the hash of all of those."""
+    fingerprint = code_fingerprint()
+    modules = []
     for ModuleClass in module_classes:
         module_config = config[ModuleClass.__name__] if ModuleClass.__name__ in config else {}
         module = ModuleClass(module_config)
-        module.render(p, context)
+        key = content_hash(fingerprint, ModuleClass.__name__, dict(module_config), module.cache_key(context))
+        modules.append((module, key))
+
+    def render(p):
+        for module, key in modules:
+            render_module(p, key, lambda recorder: module.render(recorder, context))
+
+    print_receipt(p, content_hash(*(key for _, key in modules)), render)
@@ -0,0 +1,105 @@
+"""Save a DailyContext to disk and load it back, so a receipt can be
+re-rendered later with no network access at all (`main.py --replay`).
+
+Snapshots are compact JSON, gzipped when the path ends in `.gz`.
+"""
+import gzip
+import json
+from dataclasses import asdict
+from datetime import datetime
+
+from reciept_util import atomic_write
+from .context import DailyContext
+from .data_handlers.models import Event, Project, Subtask, Task, WeatherData
+
+SNAPSHOT_VERSION = 1
+
+
+def _dt(value):
+    return value.isoformat() if value is not None else None
+
+
+def _parse_dt(value):
+    return datetime.fromisoformat(value) if value is not None else None
+
+
+def _task_to_dict(task):
+    return {
+        'name': task.name,
+        'due_date': _dt(task.due_date),
+        # Saved rather than recomputed so a replay on a later day still
+        # buckets tasks exactly as the original receipt did.
+        'delta_days': task.delta_days,
+        'subtasks': [[subtask.name, subtask.complete] for subtask in task.subtasks],
+        'subtask_overrun': task.subtask_overrun,
+    }
+
+
+def _task_from_dict(data):
+    task = Task(data['name'], _parse_dt(data['due_date']))
+    task.delta_days = data['delta_days']
+    task.subtasks = [Subtask(name, complete) for name, complete in data['subtasks']]
+    task.subtask_overrun = data['subtask_overrun']
+    return task
+
+
+def context_to_dict(context):
+    return {
+        'version': SNAPSHOT_VERSION,
+        'captured_at': context.current_time().isoformat(),
+        'projects': [
+            {'id': project.id, 'name': project.name, 'stale_note': project.stale_note,
+             'tasks': [_task_to_dict(t) for t in project.tasks]}
+            for project in context.projects
+        ],
+        'ticktick_error': context.ticktick_error,
+        'weather': asdict(context.weather) if context.weather else None,
+        'weather_error': context.weather_error,
+        'events': [
+            [event.name, _dt(event.start_time), _dt(event.end_time), event.is_all_day]
+            for event in context.events
+        ],
+        'events_errors': context.events_errors,
+    }
+
+
+def context_from_dict(data):
+    if data.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version: {data.get('version')}")
+
+    projects = []
+    for project_data in data['projects']:
+        project = Project(project_data['id'], project_data['name'])
+        project.tasks = [_task_from_dict(t) for t in project_data['tasks']]
+        project.stale_note = project_data.get('stale_note')
+        project.bucket_tasks()
+        projects.append(project)
+
+    return DailyContext(
+        projects=projects,
+        ticktick_error=data['ticktick_error'],
+        weather=WeatherData(**data['weather']) if data['weather'] else None,
+        weather_error=data['weather_error'],
+        events=[
+            Event(name, _parse_dt(start), end_time=_parse_dt(end), is_all_day=is_all_day)
+            for name, start, end, is_all_day in data['events']
+        ],
+        events_errors=data['events_errors'],
+        # A replay prints as of the capture: same date line, same forecast age.
+        now=_parse_dt(data.get('captured_at')),
+    )
+
+
+def save_snapshot(context, path):
+    payload = json.dumps(context_to_dict(context), separators=(',', ':')).encode('utf-8')
+    if str(path).endswith('.gz'):
+        payload = gzip.compress(payload)
+    atomic_write(path, payload)
+
+
+def load_snapshot(path):
+    with open(path, 'rb') as f:
+        payload = f.read()
+    if str(path).endswith('.gz'):
+        payload = gzip.decompress(payload)
+    return context_from_dict(json.loads(payload))
@@ -0,0 +1,134 @@
+"""Jinja environments shared by tasks_printer and workout_printer.
+
+Both printers get their environment from `get_env()`, which adds two layers
+of compiled-template caching on top of the plain FileSystemLoader:
+
+- a FileSystemBytecodeCache under cache/jinja, so a cold start unmarshals
+  compiled templates instead of parsing and compiling their source, and
+- optionally, templates precompiled into Python modules at install time
+  (`python3 templating.py --precompile`, run by setup.sh). A precompiled
+  template is only used while it's newer than its source, checked on every
+  load, so editing a template never prints a stale version, even in a
+  process that already rendered it.
+"""
+import sys
+from pathlib import Path
+
+from jinja2 import ChoiceLoader, Environment, FileSystemBytecodeCache, FileSystemLoader, ModuleLoader, TemplateNotFound
+
+from reciept_util import cache_subdir
+from startup_profile import phase
+
+ROOT_DIR = Path(__file__).parent
+COMPILED_DIR = ROOT_DIR / "compiled_templates"
+BYTECODE_CACHE_DIR = "jinja"
+
+# Template search paths for each printer, in lookup order.
+TEMPLATE_SETS = {
+    "tasks_printer": [ROOT_DIR / "tasks_printer" / "templates"],
+    "workout_printer": [ROOT_DIR / "workout_printer" / "workouts", ROOT_DIR / "workout_printer" / "templates"],
+}
+
+ENV_OPTIONS = dict(
+    trim_blocks=True,
+    lstrip_blocks=True,
+    keep_trailing_newline=True,
+)
+
+_envs = {}
+
+
+class ReceiptEnvironment(Environment):
+    def get_template(self, name, *args, **kwargs):
+        # Reported by `main.py --profile-startup`; free otherwise.
+        with phase(f"load template {name}"):
+            return super().get_template(name, *args, **kwargs)
+
+
+def _newest_source_mtime(search_paths):
+    return max((path.stat().st_mtime for directory in search_paths for path in directory.glob("*.jinja")), default=0)
+
+
+def _precompiled_dir(name, search_paths):
+    """The precompiled module directory for `name`, if it's up to date."""
+    compiled = COMPILED_DIR / name
+    try:
+        compiled_mtime = compiled.stat().st_mtime
+    except OSError:
+        return None
+    return compiled if compiled_mtime >= _newest_source_mtime(search_paths) else None
+
+
+class FreshModuleLoader(ModuleLoader):
+    """Serves a precompiled template only while it's newer than its source.
+    Otherwise the template counts as not found here, and the next loader in
+    the ChoiceLoader compiles the edited source."""
+
+    def __init__(self, compiled, search_paths):
+        super().__init__(str(compiled))
+        self.compiled = compiled
+        self.search_paths = search_paths
+
+    def is_fresh(self, name):
+        try:
+            compiled_mtime = self.compiled.stat().st_mtime
+        except OSError:
+            return False
+        for directory in self.search_paths:
+            try:
+                return (directory / name).stat().st_mtime <= compiled_mtime
+            except OSError:
+                continue
+        return False
+
+    def load(self, environment, name, globals=None):
+        if not self.is_fresh(name):
+            raise TemplateNotFound(name)
+        template = super().load(environment, name, globals)
+        # Module templates are otherwise always "up to date", so the
+        # environment's template cache would keep serving them after an edit.
+        template._uptodate = lambda: self.is_fresh(name)
+        return template
+
+
+def _bytecode_cache():
+    directory = cache_subdir(BYTECODE_CACHE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    return FileSystemBytecodeCache(str(directory))
+
+
+def _make_env(name, precompiled=True):
+    search_paths = TEMPLATE_SETS[name]
+    loader = FileSystemLoader([str(path) for path in search_paths])
+    compiled = _precompiled_dir(name, search_paths) if precompiled else None
+    if compiled is not None:
+        loader = ChoiceLoader([FreshModuleLoader(compiled, search_paths), loader])
+    return ReceiptEnvironment(loader=loader, bytecode_cache=_bytecode_cache(), **ENV_OPTIONS)
+
+
+def get_env(name):
+    """The shared environment for one of TEMPLATE_SETS, created once per process."""
+    env = _envs.get(name)
+    if env is None:
+        env = _envs[name] = _make_env(name)
+    return env
+
+
+def precompile():
+    """Compile every template set into COMPILED_DIR/<name> as Python modules."""
+    for name in TEMPLATE_SETS:
+        target = COMPILED_DIR / name
+        target.mkdir(parents=True, exist_ok=True)
+        for stale in target.glob("*.py"):
+            stale.unlink()
+        env = _make_env(name, precompiled=False)
+        env.compile_templates(str(target), zip=None, ignore_errors=False)
+        # Directory mtime is what _precompiled_dir compares against sources.
+        target.touch()
+        print(f"Precompiled {len(env.list_templates())} {name} templates into {target}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["--precompile"]:
+        sys.exit("usage: python3 templating.py --precompile")
+    precompile()
@@ -0,0 +1,38 @@
+"""Keeps the tests' caches out of the checkout.
+
+Imported by every test before any repo module, so RECIEPT_CACHE_DIR points
+at a temp dir by the time reciept_util reads it; everything the tests write
+under the cache (render cache, jinja bytecode, task store, spool, ...) goes
+there and is removed at exit.
+"""
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+CACHE_DIR = tempfile.mkdtemp(prefix="reciept-test-cache-")
+os.environ["RECIEPT_CACHE_DIR"] = CACHE_DIR
+atexit.register(shutil.rmtree, CACHE_DIR, ignore_errors=True)
+if "reciept_util" in sys.modules:
+    # Imported too late to steer the env var; every cache reads this at call time.
+    sys.modules["reciept_util"].CACHE_DIR = Path(CACHE_DIR)
+
+
+@contextmanager
+def fresh_cache_dir():
+    """An empty cache dir, with an empty in-memory render cache, for the
+    duration of the block; yields its path."""
+    import reciept_util
+    import render_cache
+
+    cache_dir, cache = reciept_util.CACHE_DIR, render_cache.render_cache
+    with tempfile.TemporaryDirectory() as tmp:
+        reciept_util.CACHE_DIR = Path(tmp)
+        render_cache.render_cache = render_cache.RenderCache()
+        try:
+            yield Path(tmp)
+        finally:
+            reciept_util.CACHE_DIR, render_cache.render_cache = cache_dir, cache
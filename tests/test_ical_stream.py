@@ -0,0 +1,77 @@
+"""The streaming iCal prefilter must expand to exactly the same occurrences
+as parsing the whole feed, while dropping events that can't land in the
+window.
+
+Run with: python3 tests/test_ical_stream.py
+"""
+import sys
+import tempfile
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import _cache  # before any repo module: keeps the caches out of the checkout
+
+from tasks_printer.data_handlers.ical_calendar_api import _expand_occurrences
+from tasks_printer.data_handlers.ical_stream import filter_feed
+
+TZ = ZoneInfo("America/Los_Angeles")
+
+
+def _feed(today):
+    old = today - timedelta(days=400)
+    soon = today + timedelta(days=3)
+    lines = [
+        "BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:test",
+        # Ancient one-off event: should be filtered out.
+        "BEGIN:VEVENT", "UID:old", f"DTSTART:{old:%Y%m%d}T170000Z", f"DTEND:{old:%Y%m%d}T180000Z",
+        "SUMMARY:Long ago", "END:VEVENT",
+        # Weekly series that ended before the window: filtered out.
+        "BEGIN:VEVENT", "UID:ended", f"DTSTART:{old:%Y%m%d}T170000Z", f"DTEND:{old:%Y%m%d}T180000Z",
+        f"RRULE:FREQ=WEEKLY;UNTIL={old + timedelta(days=30):%Y%m%d}T000000Z", "SUMMARY:Ended series", "END:VEVENT",
+        # Open-ended daily series from long ago: kept and expanded.
+        "BEGIN:VEVENT", "UID:daily", f"DTSTART:{old:%Y%m%d}T160000Z", f"DTEND:{old:%Y%m%d}T163000Z",
+        "RRULE:FREQ=DAILY", "SUMMARY:Daily standup with a summary that is", "  folded onto two lines",
+        "BEGIN:VALARM", "ACTION:DISPLAY", "TRIGGER:-PT10M", "END:VALARM", "END:VEVENT",
+        # Override moving one of the daily occurrences.
+        "BEGIN:VEVENT", "UID:daily", f"RECURRENCE-ID:{soon:%Y%m%d}T160000Z",
+        f"DTSTART:{soon:%Y%m%d}T200000Z", f"DTEND:{soon:%Y%m%d}T203000Z", "SUMMARY:Moved standup", "END:VEVENT",
+        # Multi-day all-day event that started before the window.
+        "BEGIN:VEVENT", "UID:trip", f"DTSTART;VALUE=DATE:{today - timedelta(days=2):%Y%m%d}",
+        f"DTEND;VALUE=DATE:{today + timedelta(days=2):%Y%m%d}", "SUMMARY:Trip", "END:VEVENT",
+        "END:VCALENDAR",
+    ]
+    return "\r\n".join(lines) + "\r\n"
+
+
+def test_streaming_matches_full_parse():
+    today = date.today()
+    window_start = datetime.combine(today, time.min, tzinfo=TZ)
+    window_end = window_start + timedelta(days=60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "feed.ics"
+        path.write_text(_feed(today), encoding="utf-8")
+
+        filtered = filter_feed(path, window_start, window_end)
+        assert "Long ago" not in filtered
+        assert "Ended series" not in filtered
+        assert "Moved standup" in filtered
+
+        streamed = _expand_occurrences(path, TZ, window_start, window_end, streaming=True)
+        full = _expand_occurrences(path, TZ, window_start, window_end, streaming=False)
+
+    assert streamed == full
+    summaries = {occurrence[3] for occurrence in streamed}
+    assert {"Trip", "Moved standup"} <= summaries
+    print(f"PASS: streaming prefilter expanded the same {len(streamed)} occurrences as a full parse")
+
+
+def main():
+    test_streaming_matches_full_parse()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""A prefetch taken while offline has every offline-served source refetched
+at print time, not just the ones that came back with an error.
+
+Run with: python3 tests/test_prefetch.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import _cache  # before any repo module: keeps the caches out of the checkout
+
+from tasks_printer.context import SCHEDULE_NOT_CONFIGURED, DailyContext
+from tasks_printer.data_handlers.models import Project, WeatherData
+from tasks_printer.prefetch import failed_sources
+
+
+def test_offline_copies_count_as_failed():
+    project = Project("p1", "House")
+    assert failed_sources(DailyContext(projects=[project], events_errors=[SCHEDULE_NOT_CONFIGURED])) == []
+
+    project.stale_note = "offline, synced Mon 03/09 06:30 AM"
+    weather = WeatherData(day_temp_min=51.2, day_temp_max=70.4, day_weather_code=3, fetched_at=1.0, stale=True)
+    context = DailyContext(
+        projects=[project],
+        weather=weather,
+        events_errors=["Calendar offline, using copy from Mon 03/09 06:30 AM"],
+    )
+    assert failed_sources(context) == ['ticktick', 'weather', 'schedule']
+
+
+def main():
+    test_offline_copies_count_as_failed()
+
+
+if __name__ == "__main__":
+    main()
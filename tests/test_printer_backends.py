@@ -0,0 +1,71 @@
+"""The same receipt encodes to the same ESC/POS bytes whether it's written
+straight to the device or buffered and sent in `write_size`-byte writes,
+and the file backend stores exactly those bytes, so receipts can be diffed
+without a printer.
+
+Run with: python3 tests/test_printer_backends.py
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import _cache  # before any repo module: keeps the caches out of the checkout
+
+from escpos.printer import Dummy
+
+from RecieptPrinter import RecieptPrinter, open_backend
+
+WRITE_SIZE = 16
+
+
+class RecordingDummy(Dummy):
+    """A memory backend that also records the size of every write."""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = []
+
+    def _raw(self, msg):
+        self.writes.append(len(msg))
+        super()._raw(msg)
+
+
+def _print_receipt(p):
+    p.set(bold=True, double_width=True, double_height=True)
+    p.text("March 9th 2026")
+    p.set_with_default()
+    p.text("Take out trash, then the recycling, then the compost", wrap=True)
+    p.text("x" * 60)
+    p.cut()
+
+
+def test_buffered_matches_direct():
+    direct = RecieptPrinter(dry=False, backend=open_backend({'backend': 'memory'}))
+    _print_receipt(direct)
+    expected = direct.device.output
+    assert expected
+
+    device = RecordingDummy()
+    buffered = RecieptPrinter(dry=False, buffered=True, write_size=WRITE_SIZE, backend=device)
+    _print_receipt(buffered)
+    assert device.output == expected, "Buffered output differs from the direct output"
+    assert len(device.writes) > 1 and max(device.writes) <= WRITE_SIZE, device.writes
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "receipt.bin"
+        config = {'Printer': {'backend': 'file', 'path': str(path), 'spool': 'false',
+                              'buffered': 'true', 'write_size': str(WRITE_SIZE)}}
+        to_file = RecieptPrinter.from_config(config, dry=False)
+        _print_receipt(to_file)
+        to_file.close()
+        assert path.read_bytes() == expected, "File backend stored different bytes"
+
+
+def main():
+    test_buffered_matches_direct()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""The render cache's code fingerprint follows edits made while the process
+is running, so a resident daemon never replays output from old code, and
+old entries are pruned even by runs that never cache a whole receipt.
+
+Run with: python3 tests/test_render_cache.py
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import _cache  # before any repo module: keeps the caches out of the checkout
+
+import render_cache
+
+
+def test_fingerprint_follows_edits():
+    root_dir = render_cache.ROOT_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        template = Path(tmp) / "tasks_printer" / "templates" / "weather.jinja"
+        template.parent.mkdir(parents=True)
+        template.write_text("Weather")
+        render_cache.ROOT_DIR = Path(tmp)
+        try:
+            before = render_cache.code_fingerprint()
+            assert render_cache.code_fingerprint() == before
+
+            stat = template.stat()
+            template.write_text("Forecast")
+            os.utime(template, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+            assert render_cache.code_fingerprint() != before, "Template edit kept the old fingerprint"
+        finally:
+            render_cache.ROOT_DIR = root_dir
+
+
+class DryPrinter:
+    """A printer that can't capture its output, like a dry or unbuffered run."""
+    can_capture = False
+
+    def start_capture(self):
+        pass
+
+    def stop_capture(self):
+        return None
+
+    def text(self, string, wrap=False):
+        pass
+
+
+def test_dry_runs_prune_old_entries():
+    with _cache.fresh_cache_dir():
+        render_cache.render_module(DryPrinter(), "old", lambda p: p.text("yesterday"))
+        old_path = render_cache.render_cache._path("old", ".json")
+        week_ago = time.time() - (render_cache.RETENTION_DAYS + 1) * 86400
+        os.utime(old_path, (week_ago, week_ago))
+
+        render_cache.print_receipt(DryPrinter(), "receipt", lambda p: render_cache.render_module(
+            p, "new", lambda recorder: recorder.text("today")))
+        assert not old_path.exists(), "Old module entry was never pruned"
+        assert render_cache.render_cache.get_calls("old") is None
+        assert render_cache.render_cache.get_calls("new") == [['text', ['today'], {}]]
+
+
+def main():
+    test_fingerprint_follows_edits()
+    test_dry_runs_prune_old_entries()
+
+
+if __name__ == "__main__":
+    main()
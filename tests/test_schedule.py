@@ -0,0 +1,83 @@
+"""The schedule grid draws sub-hour events on 15/30-minute rows, labels only
+the first row of each hour, and with compress_empty folds runs of empty
+rows into one "..." row, labeling the row after it with its hour.
+
+Run with: python3 tests/test_schedule.py
+"""
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import _cache  # before any repo module: keeps the caches out of the checkout
+
+from RecieptPrinter import CHAR_WIDTH
+from tasks_printer.context import DailyContext
+from tasks_printer.data_handlers.models import Event
+from tasks_printer.modules.schedule import COMPRESSED_ROW, ModuleSchedule
+
+# One column: the whole width after the hour label and its spacer.
+COLUMN_WIDTH = CHAR_WIDTH - 3
+BLANK = " " * COLUMN_WIDTH
+
+
+class LinePrinter:
+    def __init__(self):
+        self.lines = []
+
+    def text(self, string, wrap=False):
+        self.lines.append(string)
+
+    def set(self, **kwargs):
+        pass
+
+
+def _render(config, *events):
+    p = LinePrinter()
+    ModuleSchedule(config).render(p, DailyContext(events=list(events)))
+    assert p.lines[0] == "Today's Schedule"
+    return p.lines[1:]
+
+
+def _event(start, end):
+    return Event("Standup", datetime(2026, 3, 10, *start), end_time=datetime(2026, 3, 10, *end))
+
+
+def test_half_hour_rows():
+    lines = _render({'start_hour': '9', 'end_hour': '10', 'resolution_minutes': '30'}, _event((9, 0), (10, 30)))
+    assert lines == [
+        "09 +Standup" + "-" * (COLUMN_WIDTH - 9) + "+",
+        "   |" + " " * (COLUMN_WIDTH - 2) + "|",
+        "10 +" + "-" * (COLUMN_WIDTH - 2) + "+",
+        "   " + BLANK,
+    ], lines
+
+
+def test_quarter_hour_rows_with_compress_empty():
+    config = {'start_hour': '9', 'end_hour': '10', 'resolution_minutes': '15'}
+    event = _event((9, 30), (10, 0))
+    top = "   +Standup" + "-" * (COLUMN_WIDTH - 9) + "+"
+    bottom = "   +" + "-" * (COLUMN_WIDTH - 2) + "+"
+
+    assert _render(config, event) == [
+        "09 " + BLANK, "   " + BLANK, top, bottom,
+        "10 " + BLANK, "   " + BLANK, "   " + BLANK, "   " + BLANK,
+    ]
+    assert _render({**config, 'compress_empty': 'yes'}, event) == [
+        COMPRESSED_ROW, "09" + top[2:], bottom, COMPRESSED_ROW,
+    ]
+
+    # A single empty row is printed as is.
+    assert _render({**config, 'end_hour': '9', 'compress_empty': 'yes'}, _event((9, 15), (9, 45))) == [
+        "09 " + BLANK, top, bottom, "   " + BLANK,
+    ]
+
+
+def main():
+    test_half_hour_rows()
+    test_quarter_hour_rows_with_compress_empty()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""A DailyContext saved with save_snapshot and loaded back must render the
+exact same receipt, without any network access, on any later day.
+
+Run with: python3 tests/test_snapshot.py
+"""
+import configparser
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import _cache  # before any repo module: keeps the caches out of the checkout
+
+from tasks_printer.context import DailyContext
+from tasks_printer.data_handlers.models import Event, Project, Subtask, Task
+from tasks_printer.data_handlers.weather_api import WeatherData
+from tasks_printer.printer import render_receipt
+from tasks_printer.snapshot import load_snapshot, save_snapshot
+from RecieptPrinter import RecieptPrinter
+
+
+def _sample_context():
+    now = datetime.now().astimezone()
+    project = Project("p1", "House")
+    task = Task("Take out trash", now)
+    task.subtasks = [Subtask("Recycling", False), Subtask("Compost", 2)]
+    task.subtask_overrun = 4
+    project.stale_note = "offline, synced Mon 03/09 06:30 AM"
+    project.tasks = [task, Task("Fix the sink", now - timedelta(days=2)), Task("Paint", now - timedelta(days=9))]
+
+    return DailyContext(
+        projects=[project],
+        weather=WeatherData(day_temp_min=51.2, day_temp_max=70.4, day_weather_code=3, fetched_at=1.0),
+        events=[
+            Event("Standup", now.replace(hour=9, minute=0), end_time=now.replace(hour=10, minute=0)),
+            Event("Holiday", now.replace(hour=0, minute=0), is_all_day=True),
+        ],
+        events_errors=["Calendar fetch failed: timed out after 20s"],
+    )
+
+
+def _render(context):
+    lines = []
+    p = RecieptPrinter(dry=True)
+    p.text = lambda string, *args, **kwargs: lines.append(string)
+    p.cut = lambda: lines.append("<cut>")
+    # The tasks module samples reschedule candidates at random.
+    random.seed(0)
+    # A fresh, empty render cache, so every call really renders and no
+    # cache entries are written into the checkout.
+    with _cache.fresh_cache_dir():
+        render_receipt(p, context, configparser.ConfigParser())
+    return lines
+
+
+def test_roundtrip_renders_identically():
+    context = _sample_context()
+    for suffix in (".json", ".json.gz"):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / f"snapshot{suffix}"
+            save_snapshot(context, path)
+            replayed = load_snapshot(path)
+
+        assert _render(replayed) == _render(context), f"Replay from {suffix} rendered differently"
+    print("PASS: snapshot replay renders the same receipt as the original context")
+
+
+def test_replay_on_another_day():
+    # Captured on an earlier day, with a forecast served 30 minutes stale.
+    captured_at = datetime(2026, 3, 9, 7, 0).astimezone()
+    context = _sample_context()
+    context.now = captured_at
+    context.weather.fetched_at = (captured_at - timedelta(minutes=30)).timestamp()
+    context.weather.stale = True
+    original = _render(context)
+    assert "March 9th 2026\n" in original, original
+    assert "(offline, forecast is 30m old)" in "\n".join(original), original
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "snapshot.json"
+        save_snapshot(context, path)
+        replayed = load_snapshot(path)
+    assert replayed.now == captured_at
+    assert _render(replayed) == original, "Replay on a later day rendered differently"
+
+
+def main():
+    test_roundtrip_renders_identically()
+    test_replay_on_another_day()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Spooled print jobs survive printer errors and restarts: a job that can't
+be sent stays on disk and prints, in order, once the printer is back.
+
+Run with: python3 tests/test_spool.py
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import _cache  # before any repo module: keeps the caches out of the checkout
+
+from escpos.printer import Dummy
+
+import spool
+from spool import PrintSpool
+
+
+def _unplugged():
+    raise OSError("printer unplugged")
+
+
+def test_jobs_resume_after_failure():
+    with _cache.fresh_cache_dir() as tmp:
+        offline = PrintSpool(_unplugged, write_size=4, retries=1, retry_backoff=0)
+        offline.submit(b"first receipt")
+        offline.submit(b"second receipt")
+        assert not offline.drain()
+        assert offline.pending() == 2
+        assert "unplugged" in offline.last_error
+
+        # A new spool (the next run, or after a crash) picks the jobs up.
+        device = Dummy()
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise OSError("USB reset")
+            return device
+
+        restarted = PrintSpool(flaky, write_size=4, retries=2, retry_backoff=0)
+        restarted.submit(b"third receipt")
+        assert restarted.drain()
+        assert device.output == b"first receiptsecond receiptthird receipt"
+        assert not list((tmp / spool.SPOOL_DIR).iterdir())
+
+
+class SlowExitSpool(PrintSpool):
+    """Lingers after each drain, as a worker thread may before it exits."""
+
+    def _drain_loop(self):
+        super()._drain_loop()
+        time.sleep(0.2)
+
+
+def test_submit_right_after_drain():
+    with _cache.fresh_cache_dir() as tmp:
+        device = Dummy()
+        slow = SlowExitSpool(lambda: device, write_size=4, retries=0, retry_backoff=0)
+        slow.submit(b"one")
+        assert slow.drain(timeout=5)
+        slow.submit(b"two")
+        assert slow.drain(timeout=5), "Job submitted after a drain was never sent"
+        assert device.output == b"onetwo"
+
+
+def test_unexpected_error_does_not_hang_drain():
+    with _cache.fresh_cache_dir() as tmp:
+        def broken():
+            raise RuntimeError("driver bug")
+
+        failing = PrintSpool(broken, write_size=4, retries=0, retry_backoff=0)
+        failing.submit(b"stuck")
+        assert not failing.drain(timeout=5)
+        assert failing.pending() == 1
+
+
+def main():
+    test_jobs_resume_after_failure()
+    test_submit_right_after_drain()
+    test_unexpected_error_does_not_hang_drain()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Startup-time regression check: a dry run with nothing configured must not
+import the heavy optional stacks (iCal, escpos/pyusb, emoji), and its imports
+must stay inside a time budget.
+
+Run with: python3 tests/test_startup.py
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import _cache  # before any repo module: keeps the caches out of the checkout
+
+from startup_profile import parse_importtime, run_profiled
+
+# Generous enough for a loaded dev machine; the dry run itself is ~100 ms.
+IMPORT_BUDGET_MS = 750
+
+LAZY_MODULES = ["icalendar", "recurring_ical_events", "escpos", "usb", "emoji", "requests"]
+
+
+def test_dry_run_imports_stay_lazy():
+    with tempfile.TemporaryDirectory() as tmp:
+        (Path(tmp) / "config.ini").write_text("")
+        returncode, stderr, _ = run_profiled(["--dry"], cwd=tmp)
+    assert returncode == 0, stderr
+
+    imports = parse_importtime(stderr)
+    imported = {name.split(".")[0] for name, _, _, _ in imports}
+    eager = [module for module in LAZY_MODULES if module in imported]
+    assert not eager, f"Imported although nothing needs them: {eager}"
+
+    main_import_ms = sum(cumulative for name, _, cumulative, depth in imports if depth == 0 and name != "site") / 1000
+    assert main_import_ms < IMPORT_BUDGET_MS, f"Imports took {main_import_ms:.0f} ms (budget {IMPORT_BUDGET_MS} ms)"
+    print(f"PASS: dry run imported only what it needed in {main_import_ms:.0f} ms")
+
+
+def main():
+    test_dry_run_imports_stay_lazy()
+
+
+if __name__ == "__main__":
+    main()
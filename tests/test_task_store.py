@@ -0,0 +1,54 @@
+"""The task store only rewrites tasks that changed, drops tasks that are
+gone, and answers the receipt's due-today / late queries from what it holds.
+
+Run with: python3 tests/test_task_store.py
+"""
+import sys
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import _cache  # before any repo module: keeps the caches out of the checkout
+
+from tasks_printer.data_handlers.task_store import TaskStore
+
+TODAY = date(2026, 3, 10)
+
+
+def _task(task_id, days, modified="v1"):
+    due = (TODAY + timedelta(days=days)).isoformat()
+    return {'id': task_id, 'title': task_id, 'dueDate': f"{due}T08:00:00.000+0000", 'modifiedTime': modified,
+            'items': [{'title': 'step', 'status': 0}]}
+
+
+def _titles(tasks_json):
+    return [task['title'] for task in tasks_json]
+
+
+def test_sync_and_queries():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TaskStore(Path(tmp) / "tasks.sqlite3")
+        tasks = [_task("today", 0), _task("yesterday", -1), _task("old", -9), _task("soon", 2)]
+        assert store.sync_project("p1", "House", "hash1", tasks) == 4
+        assert store.sync_project("p1", "House", "hash2", tasks) == 0, "Unchanged tasks were rewritten"
+
+        tasks = [_task("today", 0, modified="v2"), _task("yesterday", -1), _task("old", -9)]
+        assert store.sync_project("p1", "House", "hash3", tasks) == 1
+        assert store.payload_hash("p1") == "hash3"
+        assert store.project_ids() == {"House": "p1"}
+
+        assert _titles(store.tasks_due_today("p1", TODAY)) == ["today"]
+        assert _titles(store.tasks_late_within("p1", TODAY, 3)) == ["yesterday"]
+        assert _titles(store.tasks_late_beyond("p1", TODAY, 3)) == ["old"]
+        assert store.tasks_due_today("p1", TODAY)[0]['items'] == [{'title': 'step', 'status': 0}]
+        assert store.tasks_due_today("p1", TODAY + timedelta(days=2)) == [], "Deleted task is still stored"
+
+
+def main():
+    test_sync_and_queries()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""A precompiled template is only served while it's newer than its source:
+editing the .jinja renders the new text, even from an environment that
+already rendered the precompiled version.
+
+Run with: python3 tests/test_templating.py
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import _cache  # before any repo module: keeps the caches out of the checkout
+
+import templating
+
+
+def test_edited_template_replaces_precompiled():
+    template_sets, compiled_dir = templating.TEMPLATE_SETS, templating.COMPILED_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        source_dir = Path(tmp) / "templates"
+        source_dir.mkdir()
+        source = source_dir / "weather.jinja"
+        source.write_text("Sunny")
+        stat = source.stat()
+        # Sources older than the precompiled modules, as after setup.sh.
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10_000_000_000))
+
+        templating.TEMPLATE_SETS = {"test": [source_dir]}
+        templating.COMPILED_DIR = Path(tmp) / "compiled"
+        try:
+            templating.precompile()
+            env = templating._make_env("test")
+            assert isinstance(env.loader.loaders[0], templating.FreshModuleLoader)
+            assert env.get_template("weather.jinja").render() == "Sunny"
+
+            source.write_text("Rainy")
+            os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000_000))
+            assert env.get_template("weather.jinja").render() == "Rainy", "Edited template rendered stale"
+        finally:
+            templating.TEMPLATE_SETS, templating.COMPILED_DIR = template_sets, compiled_dir
+
+
+def main():
+    test_edited_template_replaces_precompiled()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""get_tasks_from_projects must build the same tasks whether the project
+payload is streamed through ijson or decoded whole (no ijson installed),
+only build the tasks its TaskQuery asks for, and share the download of a
+project that's also read as events.
+
+Run with: python3 tests/test_ticktick_stream.py
+"""
+import io
+import json
+import sys
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import _cache  # before any repo module: keeps the caches out of the checkout
+
+import tasks_printer.data_handlers.ticktick_api as ticktick_api_mod
+from tasks_printer.data_handlers import transport
+from tasks_printer.data_handlers.task_store import TaskStore
+
+PAYLOAD = {
+    'project': {'id': 'p1', 'name': 'House'},
+    'tasks': [
+        {'title': 'Undated', 'items': [{'title': 'never seen', 'status': 0}]},
+        {'title': 'Trash', 'dueDate': '2026-01-05T08:00:00.000+0000',
+         'items': [{'title': f'item {i}', 'status': i % 2} for i in range(8)]},
+        {'title': 'Sink', 'dueDate': '2026-01-03T08:00:00.000-0800'},
+    ],
+    'columns': [],
+}
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, body):
+        self.body = body
+        self.raw = io.BytesIO(body)
+
+    def json(self):
+        return json.loads(self.body)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _fetch(show_completed_subtasks, query=None):
+    api = ticktick_api_mod.TickTickAPI("fake-token", query=query)
+    api._project_ids = {'House': 'p1'}
+    [project] = api.get_tasks_from_projects(['House'], max_subtasks=5, show_completed_subtasks=show_completed_subtasks)
+    return [
+        (task.name, task.due_date, [(s.name, s.complete) for s in task.subtasks], task.subtask_overrun)
+        for task in project.tasks
+    ]
+
+
+def test_streamed_matches_whole_decode():
+    original_get = transport.get
+    transport.get = lambda url, settings=None, **kwargs: FakeResponse(json.dumps(PAYLOAD).encode())
+    try:
+        for show_completed_subtasks in (False, True):
+            streamed = _fetch(show_completed_subtasks)
+            sys.modules['ijson'] = None  # import ijson now raises ImportError
+            try:
+                whole = _fetch(show_completed_subtasks)
+            finally:
+                del sys.modules['ijson']
+            assert streamed == whole, (streamed, whole)
+            assert [name for name, *_ in streamed] == ['Trash', 'Sink']
+    finally:
+        transport.get = original_get
+
+
+def test_query_skips_unwanted_tasks():
+    def task(title, days, tags=()):
+        due = (date.today() + timedelta(days=days)).isoformat()
+        return {'title': title, 'dueDate': f"{due}T08:00:00.000+0000", 'tags': list(tags)}
+
+    payload = {'tasks': [
+        task('Today', 0, ['home']),
+        task('Tomorrow', 1, ['home']),
+        task('Last week', -7, ['Home']),
+        task('Last year', -365, ['home']),
+        task('Untagged', -1),
+        task('Someday', -2, ['home', 'someday']),
+    ]}
+    query = ticktick_api_mod.TaskQuery.from_config({
+        'projects': 'House', 'max_overdue_days': '30', 'tags': 'home', 'exclude_tags': 'someday',
+    })
+    assert query.projects == ('House',)
+
+    original_get = transport.get
+    transport.get = lambda url, settings=None, **kwargs: FakeResponse(json.dumps(payload).encode())
+    try:
+        assert [name for name, *_ in _fetch(False, query)] == ['Today', 'Last week']
+    finally:
+        transport.get = original_get
+
+
+def test_shared_project_downloaded_once():
+    due = f"{date.today().isoformat()}T08:00:00.000+0000"
+    payload = {'tasks': [{'title': 'Dentist', 'dueDate': due, 'items': [{'title': 'done', 'status': 2}]}]}
+    requested = []
+
+    def fake_get(url, settings=None, **kwargs):
+        requested.append(url)
+        return FakeResponse(json.dumps(payload).encode())
+
+    original_get = transport.get
+    transport.get = fake_get
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for store in (None, TaskStore(Path(tmp) / "tasks.sqlite3")):
+                requested.clear()
+                api = ticktick_api_mod.TickTickAPI("fake-token", store=store, shared_projects=['House'])
+                api._project_ids = {'House': 'p1'}
+                [project] = api.get_tasks_from_projects(['House'])
+                api.get_events_from_project('House', days_ahead=2)
+                assert [task.name for task in project.tasks] == ['Dentist']
+                assert project.tasks[0].subtasks == []
+                assert len(requested) == 1, requested
+                # Dropping completed items for the receipt left the shared payload alone.
+                assert api.get_project_tasks('p1') == payload
+    finally:
+        transport.get = original_get
+
+
+def main():
+    test_streamed_matches_whole_decode()
+    test_query_skips_unwanted_tasks()
+    test_shared_project_downloaded_once()
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,8 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
+import _cache  # before any repo module: keeps the caches out of the checkout
+
 import tasks_printer.data_handlers.ticktick_api as ticktick_api_mod
 from tasks_printer.data_handlers.models import Event, Project, Task
 from tasks_printer.context import build_context
@@ -25,8 +27,6 @@ def render_dry(config_text):
     config = configparser.ConfigParser(interpolation=None)
     config.read_string(config_text)
 
-    context = build_context(config)
-
     printed_lines = []
     p = RecieptPrinter(dry=True)
     original_text = p.text
@@ -37,8 +37,10 @@ def render_dry(config_text):
 
     p.text = capture
 
-    render_receipt(p, context, config)
-    print_workouts(p, context)
+    with _cache.fresh_cache_dir():
+        context = build_context(config)
+        render_receipt(p, context, config)
+        print_workouts(p, context)
     return "\n".join(printed_lines)
 
 
@@ -0,0 +1,28 @@
+"""Workout template tools.
+
+    python3 -m workout_printer list       every workout with its title and aliases
+    python3 -m workout_printer validate   compile and render every workout
+"""
+import sys
+
+from .printer import registry, validate_workouts
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == "list":
+        for workout in registry.workouts():
+            aliases = f" (aliases: {', '.join(workout.aliases)})" if workout.aliases else ""
+            print(f"{workout.name}: day {workout.day_number} - {workout.title}{aliases}")
+    elif command == "validate":
+        failures = validate_workouts()
+        for name, error in failures:
+            print(f"FAIL {name}: {error}")
+        print(f"{len(registry.workouts()) - len(failures)} ok, {len(failures)} failed")
+        sys.exit(1 if failures else 0)
+    else:
+        sys.exit(__doc__)
+
+
+if __name__ == "__main__":
+    main()
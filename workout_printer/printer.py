@@ -1,19 +1,18 @@
 from datetime import datetime
 from pathlib import Path
 
-from jinja2 import Environment, FileSystemLoader
+from render_cache import code_fingerprint, content_hash, print_receipt
+from templating import get_env
+from .registry import WorkoutRegistry
 
 WORKOUTS_DIR = Path(__file__).parent / "workouts"
 TEMPLATES_DIR = Path(__file__).parent / "templates"
 
-WORKOUT_TASK_PREFIX = "Workout: "
+# "Workout - {name}" is the documented form; "Workout: {name}" is also accepted.
+WORKOUT_TASK_PREFIXES = ("Workout - ", "Workout: ")
 
-env = Environment(
-    loader=FileSystemLoader([str(WORKOUTS_DIR), str(TEMPLATES_DIR)]),
-    trim_blocks=True,
-    lstrip_blocks=True,
-    keep_trailing_newline=True,
-)
+env = get_env("workout_printer")
+registry = WorkoutRegistry(WORKOUTS_DIR)
 
 
 def get_day_with_suffix(day):
@@ -24,23 +23,36 @@ def get_day_with_suffix(day):
 
 
 def list_workouts():
-    return sorted(p.stem for p in WORKOUTS_DIR.glob("*.jinja"))
+    return [workout.name for workout in registry.workouts()]
 
 
-def render_workout(name):
-    if name not in list_workouts():
+def _date_str(today=None):
+    today = today or datetime.today()
+    return f"{today.strftime('%B')} {get_day_with_suffix(today.day)} {today.year}"
+
+
+def render_workout(name, today=None):
+    """Render the workout called `name` (file name, title or alias, any
+    case) dated `today` (default: now), or return None if there's no such
+    workout."""
+    workout = registry.lookup(name)
+    if workout is None:
         return None
 
-    today = datetime.today()
-    date_str = f"{today.strftime('%B')} {get_day_with_suffix(today.day)} {today.year}"
+    template = env.get_template(workout.template_name)
+    return template.render(date=_date_str(today))
+
 
-    template = env.get_template(f"{name}.jinja")
-    return template.render(date=date_str)
+def validate_workouts():
+    """Compile and render every workout template; returns `(name, error)`
+    for each one that fails, so a broken template shows up before print time."""
+    return registry.validate(env, date=_date_str())
 
 
 def _extract_workout_name(name):
-    if name.startswith(WORKOUT_TASK_PREFIX):
-        return name[len(WORKOUT_TASK_PREFIX):].strip()
+    for prefix in WORKOUT_TASK_PREFIXES:
+        if name.startswith(prefix):
+            return name[len(prefix):].strip()
     return None
 
 
@@ -66,12 +78,22 @@ def find_workout_names(context):
 def print_workouts(p, context):
     """Check `context` for today's "Workout - {name}" tasks/events and print
     each matching workout as its own receipt."""
+    fingerprint = code_fingerprint()
+    today = context.current_time()
+    printed = set()
     for workout_name in find_workout_names(context):
-        rendered = render_workout(workout_name)
-        if rendered is None:
+        workout = registry.lookup(workout_name)
+        if workout is None:
             print(f"Unknown workout '{workout_name}' referenced by a task/event")
             continue
+        # A task and an event may name the same workout by different aliases.
+        if workout.name in printed:
+            continue
+        printed.add(workout.name)
+
+        def render(p, name=workout.name):
+            for line in render_workout(name, today).splitlines():
+                p.text(line)
+            p.cut()
 
-        for line in rendered.splitlines():
-            p.text(line)
-        p.cut()
+        print_receipt(p, content_hash(fingerprint, "workout", workout.name, _date_str(today)), render)
@@ -0,0 +1,101 @@
+"""Index of the workout templates in workouts/.
+
+Built once from the template sources and only rebuilt when the directory's
+mtime changes (a workout added, removed or renamed), so looking up a workout
+name from a task or event is a dict lookup rather than a directory glob.
+
+Each workout is found by its file name, its title, or any of its aliases,
+all case-insensitively. Metadata comes from the template's own `set`
+statements:
+
+    {% set day_number = 1 %}
+    {% set title = "UPPER (PUSH)" %}
+    {% set aliases = ["push", "day 1"] %}
+"""
+import ast
+import re
+import threading
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+_SET_RE = re.compile(r"{%-?\s*set\s+(day_number|title|aliases)\s*=\s*(.+?)\s*-?%}")
+
+
+@dataclass(frozen=True)
+class WorkoutInfo:
+    name: str
+    day_number: Optional[int] = None
+    title: Optional[str] = None
+    aliases: Tuple[str, ...] = ()
+
+    @property
+    def template_name(self):
+        return f"{self.name}.jinja"
+
+
+def _read_metadata(path):
+    values = {}
+    for key, raw in _SET_RE.findall(path.read_text(encoding="utf-8")):
+        try:
+            values.setdefault(key, ast.literal_eval(raw))
+        except (ValueError, SyntaxError):
+            print(f"Workout {path.name}: can't read {key} = {raw}")
+    return WorkoutInfo(
+        name=path.stem,
+        day_number=values.get('day_number'),
+        title=values.get('title'),
+        aliases=tuple(values.get('aliases', ())),
+    )
+
+
+def _lookup_key(name):
+    return " ".join(name.split()).casefold()
+
+
+class WorkoutRegistry:
+    def __init__(self, workouts_dir):
+        self.workouts_dir = workouts_dir
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._workouts = []
+        self._by_key = {}
+
+    def _refresh(self):
+        mtime = self.workouts_dir.stat().st_mtime_ns
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            workouts = [_read_metadata(path) for path in sorted(self.workouts_dir.glob("*.jinja"))]
+            by_key = {}
+            for workout in workouts:
+                for name in (workout.name, workout.title, *workout.aliases):
+                    if not name:
+                        continue
+                    existing = by_key.setdefault(_lookup_key(name), workout)
+                    if existing is not workout:
+                        print(f"Workout name '{name}' is used by both {existing.name} and {workout.name}")
+            self._workouts = workouts
+            self._by_key = by_key
+            self._mtime = mtime
+
+    def workouts(self):
+        self._refresh()
+        return list(self._workouts)
+
+    def lookup(self, name):
+        """The workout called `name` (file name, title or alias), or None."""
+        self._refresh()
+        return self._by_key.get(_lookup_key(name))
+
+    def validate(self, env, **render_args):
+        """Compile and render every workout with `env`; returns a list of
+        `(workout name, error)` for the ones that fail."""
+        failures = []
+        for workout in self.workouts():
+            try:
+                env.get_template(workout.template_name).render(**render_args)
+            except Exception as e:
+                failures.append((workout.name, e))
+        return failures